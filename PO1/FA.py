@@ -7,15 +7,26 @@
 #   license.                                          #
 # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
+from array import array
+from bisect import bisect_right
 import sys
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Characters below this code point are classified with a direct lookup table,
+# all others with a binary search over sorted intervals.
+DENSE_CHARS = 256
+
 
 class FA:
     """
     Finite Automaton (FA)
     """
 
-    def __init__(self, Q, Sigma, delta, s, F, verbose=False):
+    def __init__(self, Q, Sigma, delta, s, F, verbose=False, classes=None):
         """
         Creates the FA object and performs input sanitization
         Q:       The finite set of states (list or set of strings)
@@ -25,36 +36,58 @@ class FA:
         F:       The finite set of final states (list or set of strings)
         verbose: Indicator specifying whether a warning should be printed if
                  the FA attempts a non-existent transition
+        classes: Optional character classes (dictionary), mapping symbols of
+                 Sigma to the characters they stand for: a list of single
+                 characters and/or (first, last) ranges. Other single
+                 character symbols of Sigma stand for themselves.
         """
 
         # Verify proper use of states
-        if len(Q) != len(set(Q)):
+        # Test membership with sets, so large generated automata are
+        # validated in linear time
+        state_set = set(Q)
+        symbol_set = set(Sigma)
+        if len(Q) != len(state_set):
             sys.exit("StateError: Q contains duplicates")
 
-        if s not in Q:
+        if s not in state_set:
             sys.exit("StateError: Starting state \'" + s + "\' not in Q")
 
         for state in F:
-            if state not in Q:
+            if state not in state_set:
                 sys.exit("StateError: Final state \'" + state + "\' not in Q")
 
         # Verify proper use of transitions
         for state in delta:
-            if state not in Q:
+            if state not in state_set:
                 sys.exit("TransitionError: State \'" + state + "\' not in Q")
 
             for symbol, next_state in delta[state].items():
-                if symbol not in Sigma:
+                if symbol not in symbol_set:
                     sys.exit("TransitionError: Symbol \'" + symbol +
                              "\' for state \'" + state + "\' not in Sigma")
-                if next_state not in Q:
+                if next_state not in state_set:
                     sys.exit("TransitionError: State \'" + next_state +
                              "\' for symbol \'" + symbol + "\' and state \'" +
                              state + "\' not in Q")
 
+        # Verify proper use of character classes
+        if classes is None:
+            classes = {}
+        for symbol, members in classes.items():
+            if symbol not in Sigma:
+                sys.exit("ClassError: Class \'" + symbol + "\' not in Sigma")
+            for member in members:
+                first, last = member if isinstance(member, tuple) else \
+                    (member, member)
+                if len(first) != 1 or len(last) != 1 or first > last:
+                    sys.exit("ClassError: Invalid member \'" + str(member) +
+                             "\' for class \'" + symbol + "\'")
+
         # Create states
         self.states = {}
         self.final_states = []
+        final_set = set(F)
         for state_name in Q:
             # Check if the state-to-be has a transition table
             if state_name in delta.keys():
@@ -64,14 +97,132 @@ class FA:
 
             new_state = State(state_name, transition_table)
             self.states[state_name] = new_state
-            if state_name in F:
+            if state_name in final_set:
                 self.final_states.append(new_state)
 
         # Retain and assign variables
         self.verbose = verbose
         self.input_alphabet = Sigma
+        self.char_classes = classes
         self.start_state = self.states[s]
-        self.current_state = self.start_state
+
+        self.compile()
+
+    def compile(self):
+        """
+        Intern states and symbols as small integers and build the flat
+        transition table used by transition_id(). States are numbered in the
+        order of Q and symbols in the order of Sigma. The table holds -1 for
+        non-existent transitions; final states are stored as a bitmask.
+        transition_id() indexes the rows of the table per state, kept as
+        lists that end with an extra -1 for the unknown symbol id -1, and
+        transition() looks up symbols by name in a dictionary per state, so
+        both resolve a transition in a single lookup.
+        returns: The FA itself
+        """
+        self.state_names = list(self.states)
+        self.state_ids = {name: idx for idx, name in
+                          enumerate(self.state_names)}
+        self.symbol_ids = {symbol: idx for idx, symbol in
+                           enumerate(self.input_alphabet)}
+        self.num_symbols = len(self.symbol_ids)
+
+        self.table = array('i', [-1]) * (len(self.state_names) *
+                                         self.num_symbols)
+        self.next_ids = []
+        for state_name, state in self.states.items():
+            base = self.state_ids[state_name] * self.num_symbols
+            next_ids = {}
+            for symbol, next_state in state.transition_table.items():
+                next_ids[symbol] = self.state_ids[next_state]
+                self.table[base + self.symbol_ids[symbol]] = \
+                    self.state_ids[next_state]
+            self.next_ids.append(next_ids)
+        num_symbols = self.num_symbols
+        self.rows = [self.table[idx * num_symbols:
+                                (idx + 1) * num_symbols].tolist() + [-1]
+                     for idx in range(len(self.state_names))]
+
+        self.final_mask = 0
+        for state in self.final_states:
+            self.final_mask |= 1 << self.state_ids[state.name]
+
+        self.start_id = self.state_ids[self.start_state.name]
+        self.current_id = self.start_id
+        self.failed = False
+
+        self.compile_classes()
+
+        return self
+
+    def compile_classes(self):
+        """
+        Build the character lookup used by classify(): a direct table for
+        characters below DENSE_CHARS and sorted (first, last, symbol id)
+        intervals for all other characters
+        """
+        intervals = []
+        for symbol, symbol_id in self.symbol_ids.items():
+            if symbol in self.char_classes:
+                for member in self.char_classes[symbol]:
+                    first, last = member if isinstance(member, tuple) else \
+                        (member, member)
+                    intervals.append((ord(first), ord(last), symbol_id))
+            elif len(symbol) == 1:
+                intervals.append((ord(symbol), ord(symbol), symbol_id))
+        intervals.sort()
+
+        for prev, interval in zip(intervals, intervals[1:]):
+            if interval[0] <= prev[1]:
+                sys.exit("ClassError: Character \'" + chr(interval[0]) +
+                         "\' belongs to more than one symbol of Sigma")
+
+        self.char_table = array('i', [-1]) * DENSE_CHARS
+        self.interval_firsts = array('l')
+        self.interval_lasts = array('l')
+        self.interval_ids = array('i')
+        for first, last, symbol_id in intervals:
+            for code in range(first, min(last + 1, DENSE_CHARS)):
+                self.char_table[code] = symbol_id
+            if last >= DENSE_CHARS:
+                self.interval_firsts.append(max(first, DENSE_CHARS))
+                self.interval_lasts.append(last)
+                self.interval_ids.append(symbol_id)
+
+    def classify(self, char):
+        """
+        Look up the symbol of Sigma that the character 'char' belongs to
+        returns: The interned symbol id, or -1 if there is none
+        """
+        code = ord(char)
+        if code < DENSE_CHARS:
+            return self.char_table[code]
+
+        idx = bisect_right(self.interval_firsts, code) - 1
+        if idx >= 0 and code <= self.interval_lasts[idx]:
+            return self.interval_ids[idx]
+        return -1
+
+    @property
+    def current_state(self):
+        return self.states[self.state_names[self.current_id]]
+
+    @current_state.setter
+    def current_state(self, state):
+        self.current_id = self.state_ids[state.name]
+
+    def transition_id(self, symbol_id):
+        """
+        Follow the transition for the interned symbol 'symbol_id' from the
+        current state, skipping the symbol lookup of transition(). The id -1
+        stands for a symbol that is not in Sigma and always fails.
+        returns: True if succeeded, False otherwise
+        """
+        next_id = self.rows[self.current_id][symbol_id]
+        if next_id < 0:
+            return False
+        self.current_id = next_id
+        return True
 
     def transition(self, symbol):
         """
@@ -79,32 +230,278 @@ class FA:
         returns: True if succeeded, False otherwise
         """
         try:
-            self.current_state = self.states[
-                self.current_state.transition_table[symbol]]
+            self.current_id = self.next_ids[self.current_id][symbol]
             return True
 
         except KeyError:
             if self.verbose:
-                print("Warning: State \'" + self.current_state.name +
+                print("Warning: State \'" + self.state_val() +
                       "\' has no transition for symbol \'" + symbol +
                       "\', transition could not be performed")
             return False
 
+    def transition_char(self, char):
+        """
+        Try to follow the transition for the symbol (or character class) that
+        the character 'char' belongs to from the current state
+        returns: True if succeeded, False otherwise
+        """
+        symbol_id = self.classify(char)
+        if symbol_id >= 0 and self.transition_id(symbol_id):
+            return True
+
+        if self.verbose:
+            print("Warning: State \'" + self.state_val() +
+                  "\' has no transition for character \'" + char +
+                  "\', transition could not be performed")
+        return False
+
     def state_val(self):
-        return self.current_state.name
+        return self.state_names[self.current_id]
 
     def is_final(self):
         """
         Check whether the current state is a final state
         """
-        return self.current_state in self.final_states
+        return bool(self.final_mask >> self.current_id & 1)
+
+    def feed(self, symbols):
+        """
+        Continue the run with the next chunk 'symbols' of the input, so an
+        input can be verified piece by piece without holding all of it in
+        memory. Call reset() before the first chunk and result() after the
+        last one. The run fails at the first symbol without a transition.
+        returns: False once the run has failed, True otherwise
+        """
+        if not self.failed:
+            for symbol in symbols:
+                if not self.transition(symbol):
+                    self.failed = True
+                    break
+        return not self.failed
+
+    def feed_chars(self, chars):
+        """
+        Like feed(), but follows the symbol (or character class) of every
+        character in the string 'chars', see transition_char()
+        """
+        if not self.failed:
+            for char in chars:
+                if not self.transition_char(char):
+                    self.failed = True
+                    break
+        return not self.failed
+
+    def result(self):
+        """
+        Check whether the FA accepts the input fed so far
+        """
+        return not self.failed and self.is_final()
+
+    def snapshot(self):
+        """
+        Save the current configuration, to continue from it later with
+        restore(), for example for every input that shares a prefix
+        returns: The saved configuration
+        """
+        return self.current_id, self.failed
+
+    def restore(self, snapshot):
+        """
+        Continue from a configuration saved with snapshot()
+        """
+        self.current_id, self.failed = snapshot
 
     def reset(self):
-        self.current_state = self.start_state
+        self.current_id = self.start_id
+        self.failed = False
+
+    def run_batch(self, sequences):
+        """
+        Run the FA from its start state over many symbol sequences at once,
+        advancing all of them together with one vectorized lookup per step.
+        Requires NumPy. The current state of the FA is left untouched.
+        sequences: A list of sequences of symbols
+        returns: A tuple (accepted, failures) of NumPy arrays. accepted holds
+        True for every sequence that ends in a final state. failures holds the
+        index of the first symbol that could not be followed, the length of
+        the sequence if it ended outside a final state, or -1 if accepted.
+        """
+        if np is None:
+            sys.exit("ImportError: FA.run_batch requires NumPy")
+
+        # Extend the table with a dead state and two extra symbols: padding,
+        # which keeps every state as is, and unknown symbols, which fail.
+        num_states = len(self.state_names)
+        dead = num_states
+        pad = self.num_symbols
+        unknown = pad + 1
+        table = np.full((num_states + 1, self.num_symbols + 2), dead,
+                        dtype=np.int32)
+        table[:num_states, :pad] = np.frombuffer(
+            self.table, dtype=np.int32).reshape(num_states, pad)
+        table[table < 0] = dead
+        table[:, pad] = np.arange(num_states + 1)
+        final = np.array([bool(self.final_mask >> idx & 1)
+                          for idx in range(num_states)] + [False])
+
+        # Encode the sequences into a padded matrix of symbol ids
+        lengths = np.array([len(sequence) for sequence in sequences],
+                           dtype=np.int64)
+        width = int(lengths.max()) if len(sequences) else 0
+        symbols = np.full((len(sequences), width), pad, dtype=np.int32)
+        symbol_ids = self.symbol_ids
+        flat = np.array([symbol_ids.get(symbol, unknown)
+                         for sequence in sequences for symbol in sequence],
+                        dtype=np.int32)
+        rows = np.repeat(np.arange(len(sequences)), lengths)
+        offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        symbols[rows, np.arange(len(flat)) - offsets] = flat
+
+        states = np.full(len(sequences), self.start_id, dtype=np.int32)
+        failures = np.full(len(sequences), -1, dtype=np.int64)
+        for step in range(width):
+            states = table[states, symbols[:, step]]
+            failed = (states == dead) & (failures < 0)
+            failures[failed] = step
+
+        accepted = final[states]
+        unfinished = ~accepted & (failures < 0)
+        failures[unfinished] = lengths[unfinished]
+
+        return accepted, failures
+
+    def useful_states(self):
+        """
+        Find the states that are reachable from the start state and from which
+        a final state is reachable; all other states can never lead to
+        acceptance
+        returns: A set of state names
+        """
+        reachable = {self.start_state.name}
+        todo = [self.start_state.name]
+        predecessors = {name: [] for name in self.states}
+        while todo:
+            state_name = todo.pop()
+            table = self.states[state_name].transition_table
+            for next_state in table.values():
+                predecessors[next_state].append(state_name)
+                if next_state not in reachable:
+                    reachable.add(next_state)
+                    todo.append(next_state)
+
+        coreachable = {state.name for state in self.final_states
+                       if state.name in reachable}
+        todo = list(coreachable)
+        while todo:
+            for prev_state in predecessors[todo.pop()]:
+                if prev_state not in coreachable:
+                    coreachable.add(prev_state)
+                    todo.append(prev_state)
+
+        return coreachable
+
+    def minimize(self):
+        """
+        Create the minimal FA accepting the same language, using Hopcroft's
+        partition refinement in O(n log n)
+        returns: A new FA
+        """
+
+        """
+        Unreachable states and states from which no final state is reachable
+        are removed first. The remaining transitions are completed with a
+        single sink state, the partition is refined, and the block of the sink
+        is dropped again. Transitions into the sink are therefore missing from
+        the minimal FA, so a run is rejected as soon as acceptance becomes
+        impossible. Every block is named after its first state in Q.
+        """
+
+        useful = self.useful_states()
+        names = [name for name in self.state_names
+                 if name in useful or name == self.start_state.name]
+        ids = {name: idx for idx, name in enumerate(names)}
+        sink = len(names)
+        symbols = list(self.symbol_ids)
+
+        # Inverse transitions per symbol, including those into the sink
+        inverse = [[[] for _ in range(sink + 1)] for _ in symbols]
+        for name in names:
+            table = self.states[name].transition_table
+            for symbol_id, symbol in enumerate(symbols):
+                next_state = ids.get(table.get(symbol), sink)
+                inverse[symbol_id][next_state].append(ids[name])
+        for symbol_id in range(len(symbols)):
+            inverse[symbol_id][sink].append(sink)
+
+        final = {ids[state.name] for state in self.final_states
+                 if state.name in ids}
+        blocks = [set(final), set(range(sink + 1)) - final]
+        blocks = [block for block in blocks if block]
+        block_of = [0] * (sink + 1)
+        for block_id, block in enumerate(blocks):
+            for state in block:
+                block_of[state] = block_id
+
+        smallest = min(range(len(blocks)), key=lambda idx: len(blocks[idx]))
+        waiting = {(smallest, symbol_id) for symbol_id in range(len(symbols))}
+        while waiting:
+            splitter, symbol_id = waiting.pop()
+            hits = {}
+            for state in blocks[splitter]:
+                for prev_state in inverse[symbol_id][state]:
+                    hits.setdefault(block_of[prev_state], set()).add(
+                        prev_state)
+
+            for block_id, inside in hits.items():
+                if len(inside) == len(blocks[block_id]):
+                    continue
+
+                new_id = len(blocks)
+                blocks[block_id] -= inside
+                blocks.append(inside)
+                for state in inside:
+                    block_of[state] = new_id
+
+                for other_id in range(len(symbols)):
+                    if (block_id, other_id) in waiting:
+                        waiting.add((new_id, other_id))
+                    elif len(inside) <= len(blocks[block_id]):
+                        waiting.add((new_id, other_id))
+                    else:
+                        waiting.add((block_id, other_id))
+
+        # Name every block after its first state and drop the sink block
+        block_names = {}
+        for state in range(sink):
+            block_names.setdefault(block_of[state], names[state])
+        block_names.pop(block_of[sink], None)
+
+        Q = list(block_names.values())
+        delta = {}
+        for block_id, block_name in block_names.items():
+            delta[block_name] = {}
+            for symbol, next_state in \
+                    self.states[block_name].transition_table.items():
+                next_block = block_of[ids.get(next_state, sink)]
+                if next_block in block_names:
+                    delta[block_name][symbol] = block_names[next_block]
+        s = block_names.get(block_of[ids[self.start_state.name]],
+                            self.start_state.name)
+        if s not in Q:
+            Q.append(s)
+        F = [block_names[block_of[state]] for state in final
+             if block_of[state] in block_names]
+        F = list(dict.fromkeys(F))
+
+        return FA(Q, self.input_alphabet, delta, s, F, verbose=self.verbose,
+                  classes=self.char_classes)
 
 
 class State:
     """State in a Finite Automaton (FA)"""
+    __slots__ = ('name', 'transition_table')
+
     def __init__(self, name, transition_table):
         """
         name: State name
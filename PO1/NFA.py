@@ -0,0 +1,221 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from FA import FA
+from collections import OrderedDict
+import sys
+
+
+class NFA:
+    """
+    Nondeterministic Finite Automaton (NFA) with ϵ-transitions, run as a lazily
+    constructed DFA
+    """
+
+    def __init__(self, Q, Sigma, delta, s, F, verbose=False, classes=None,
+                 cache_size=4096):
+        """
+        Creates the NFA object and performs input sanitization
+        Q:          The finite set of states (list or set of strings)
+        Sigma:      The input alphabet (list of set of strings)
+        delta:      The transition relation (dictionary of dictionaries),
+                    mapping a state and a symbol to a list of states. The
+                    symbol may be replaced with 'ϵ'
+        s:          The start state (string)
+        F:          The finite set of final states (list or set of strings)
+        verbose:    Indicator specifying whether a warning should be printed
+                    if the NFA attempts a non-existent transition
+        classes:    Optional character classes, see FA
+        cache_size: The maximum amount of DFA states that is kept in memory
+        """
+
+        # Verify proper use of states
+        if len(Q) != len(set(Q)):
+            sys.exit("StateError: Q contains duplicates")
+
+        if s not in Q:
+            sys.exit("StateError: Starting state \'" + s + "\' not in Q")
+
+        for state in F:
+            if state not in Q:
+                sys.exit("StateError: Final state \'" + state + "\' not in Q")
+
+        # Verify proper use of transitions
+        for state in delta:
+            if state not in Q:
+                sys.exit("TransitionError: State \'" + state + "\' not in Q")
+
+            for symbol, next_states in delta[state].items():
+                if symbol not in Sigma and symbol != "ϵ":
+                    sys.exit("TransitionError: Symbol \'" + symbol +
+                             "\' for state \'" + state + "\' not in Sigma")
+                for next_state in next_states:
+                    if next_state not in Q:
+                        sys.exit("TransitionError: State \'" + next_state +
+                                 "\' for symbol \'" + symbol +
+                                 "\' and state \'" + state + "\' not in Q")
+
+        if cache_size < 1:
+            sys.exit("CacheError: The cache should hold at least one state")
+
+        # Intern states and symbols
+        self.state_names = list(Q)
+        self.state_ids = {name: idx for idx, name in
+                          enumerate(self.state_names)}
+        self.symbol_ids = {symbol: idx for idx, symbol in enumerate(Sigma)}
+        self.num_symbols = len(self.symbol_ids)
+
+        # Sets of states are bitmasks. Compute the ϵ-closure of every state
+        # and the closed set of successors for every state and symbol.
+        closures = []
+        for name in self.state_names:
+            closure = 1 << self.state_ids[name]
+            todo = [name]
+            while todo:
+                table = delta.get(todo.pop(), {})
+                for next_state in table.get("ϵ", []):
+                    bit = 1 << self.state_ids[next_state]
+                    if not closure & bit:
+                        closure |= bit
+                        todo.append(next_state)
+            closures.append(closure)
+
+        self.moves = []
+        for name in self.state_names:
+            moves = [0] * self.num_symbols
+            for symbol, next_states in delta.get(name, {}).items():
+                if symbol == "ϵ":
+                    continue
+                for next_state in next_states:
+                    moves[self.symbol_ids[symbol]] |= \
+                        closures[self.state_ids[next_state]]
+            self.moves.append(moves)
+
+        self.final_mask = 0
+        for state in F:
+            self.final_mask |= 1 << self.state_ids[state]
+
+        # Retain and assign variables
+        self.verbose = verbose
+        self.input_alphabet = Sigma
+        self.char_classes = classes if classes is not None else {}
+        self.start_set = closures[self.state_ids[s]]
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.reset()
+
+    def _row(self, state_set):
+        """
+        Fetch the cached transitions of the DFA state 'state_set', adding it
+        to the cache and evicting the least recently used state if needed
+        """
+        row = self.cache.get(state_set)
+        if row is None:
+            row = [None] * self.num_symbols
+            self.cache[state_set] = row
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(state_set)
+        return row
+
+    def _step(self, state_set, symbol_id):
+        """
+        Compute the DFA state reached from 'state_set' on 'symbol_id'
+        """
+        next_set = 0
+        moves = self.moves
+        while state_set:
+            bit = state_set & -state_set
+            next_set |= moves[bit.bit_length() - 1][symbol_id]
+            state_set ^= bit
+        return next_set
+
+    def transition_id(self, symbol_id):
+        """
+        Follow the transition for the interned symbol 'symbol_id' from the
+        current set of states
+        returns: True if succeeded, False if no state has such a transition
+        """
+        next_set = self.current_row[symbol_id]
+        if next_set is None:
+            next_set = self._step(self.current_set, symbol_id)
+            self.current_row[symbol_id] = next_set
+        if not next_set:
+            return False
+
+        self.current_set = next_set
+        self.current_row = self._row(next_set)
+        return True
+
+    def transition(self, symbol):
+        """
+        Try to follow the transition 'symbol' from the current set of states
+        returns: True if succeeded, False otherwise
+        """
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is not None and self.transition_id(symbol_id):
+            return True
+
+        if self.verbose:
+            print("Warning: States \'" + str(sorted(self.state_val())) +
+                  "\' have no transition for symbol \'" + symbol +
+                  "\', transition could not be performed")
+        return False
+
+    def state_val(self):
+        """
+        returns: The set of names of the current states
+        """
+        return frozenset(name for idx, name in enumerate(self.state_names)
+                         if self.current_set >> idx & 1)
+
+    def is_final(self):
+        """
+        Check whether one of the current states is a final state
+        """
+        return bool(self.current_set & self.final_mask)
+
+    def reset(self):
+        self.current_set = self.start_set
+        self.current_row = self._row(self.start_set)
+
+    def determinize(self):
+        """
+        Perform the complete subset construction
+        returns: An FA accepting the same language, with a state for every
+        reachable set of states, named after its members
+        """
+        names = {}
+        todo = [self.start_set]
+        delta = {}
+        while todo:
+            state_set = todo.pop()
+            if state_set in names:
+                continue
+            names[state_set] = "{" + ",".join(
+                name for idx, name in enumerate(self.state_names)
+                if state_set >> idx & 1) + "}"
+            delta[state_set] = {}
+            for symbol, symbol_id in self.symbol_ids.items():
+                next_set = self._step(state_set, symbol_id)
+                if next_set:
+                    delta[state_set][symbol] = next_set
+                    todo.append(next_set)
+
+        Q = list(names.values())
+        delta = {names[state_set]: {symbol: names[next_set] for
+                                    symbol, next_set in table.items()}
+                 for state_set, table in delta.items()}
+        s = names[self.start_set]
+        F = [name for state_set, name in names.items()
+             if state_set & self.final_mask]
+
+        return FA(Q, self.input_alphabet, delta, s, F, verbose=self.verbose,
+                  classes=self.char_classes)
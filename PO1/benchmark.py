@@ -0,0 +1,175 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from FA import np
+from NFA import NFA
+import lexer as lexer
+import verify as verify
+import random
+import sys
+import time
+
+SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7, 10 ** 8]
+
+
+def make_trace(size):
+    """
+    Creates a valid trace of exactly 'size' characters by repeating a
+    single step
+    """
+    step = "- a + b > "
+    return (step * (size // len(step) + 1))[:size]
+
+
+def bench_lexer(sizes):
+    """
+    Streams traces of increasing size through lexer.lex and verify_steps.
+    Linear scaling shows up as a constant time per character.
+    """
+    M_lexer = lexer.create_fa()
+    M_verify = verify.create_fa()
+
+    print("lexer.lex + verify.verify_steps")
+    print("%12s %10s %12s" % ("size", "seconds", "ns/char"))
+    for size in sizes:
+        trace = make_trace(size)
+        start = time.perf_counter()
+        verify.verify_steps(M_verify, lexer.lex(M_lexer, trace))
+        elapsed = time.perf_counter() - start
+        print("%12d %10.3f %12.1f" % (size, elapsed, elapsed / size * 1e9))
+
+
+def bench_spans(sizes):
+    """
+    Tokenizes traces of increasing size with lexer.lex_spans and feeds the
+    token-kind column to verify.verify_kinds
+    """
+    M_lexer = lexer.create_fa()
+    M_verify = verify.create_fa()
+
+    print("lexer.lex_spans + verify.verify_kinds")
+    print("%12s %10s %12s" % ("size", "seconds", "ns/char"))
+    for size in sizes:
+        trace = make_trace(size)
+        start = time.perf_counter()
+        kinds = lexer.lex_spans(M_lexer, trace)[2]
+        verify.verify_kinds(M_verify, kinds, M_lexer.state_names)
+        elapsed = time.perf_counter() - start
+        print("%12d %10.3f %12.1f" % (size, elapsed, elapsed / size * 1e9))
+
+
+def bench_product(sizes):
+    """
+    Validates traces of increasing size in a single pass with the product FA
+    of verify.create_product_fa
+    """
+    M_product = verify.create_product_fa(lexer.create_fa(), verify.create_fa())
+
+    print("verify.validate")
+    print("%12s %10s %12s" % ("size", "seconds", "ns/char"))
+    for size in sizes:
+        trace = make_trace(size)
+        start = time.perf_counter()
+        verify.validate(M_product, trace)
+        elapsed = time.perf_counter() - start
+        print("%12d %10.3f %12.1f" % (size, elapsed, elapsed / size * 1e9))
+
+
+def make_steps(count, seed=0):
+    """
+    Creates 'count' short token sequences for the step verification FA, each
+    a few valid steps with a random token replaced in some of them
+    """
+    rng = random.Random(seed)
+    step = ['READ', 'SYMBOL', 'WRITE', 'BLANK', 'MRIGHT']
+    tokens = ['SPACE', 'MLEFT', 'MRIGHT', 'READ', 'WRITE', 'BLANK', 'LEM',
+              'SYMBOL']
+    sequences = []
+    for _ in range(count):
+        sequence = step * rng.randint(1, 6)
+        if rng.random() < 0.5:
+            sequence[rng.randrange(len(sequence))] = rng.choice(tokens)
+        sequences.append(sequence)
+    return sequences
+
+
+def bench_batch(count):
+    """
+    Compares FA.run_batch against running FA.transition per sequence
+    """
+    M_verify = verify.create_fa()
+    sequences = make_steps(count)
+
+    print("FA.transition loop vs FA.run_batch (%d sequences)" % count)
+    start = time.perf_counter()
+    expected = []
+    for sequence in sequences:
+        M_verify.reset()
+        for symbol in sequence:
+            if not M_verify.transition(symbol):
+                break
+        else:
+            expected.append(M_verify.is_final())
+            continue
+        expected.append(False)
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f" % ("FA.transition", elapsed))
+
+    start = time.perf_counter()
+    accepted = M_verify.run_batch(sequences)[0]
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f" % ("FA.run_batch", elapsed))
+
+    if list(accepted) != expected:
+        sys.exit("BenchmarkError: FA.run_batch disagrees with FA.transition")
+
+
+def bench_nfa(count):
+    """
+    Compares the lazily determinized NFA against the compiled FA for the same
+    step verification automaton
+    """
+    M_verify = verify.create_fa()
+    delta = {state.name: {symbol: [next_state] for symbol, next_state in
+                          state.transition_table.items()}
+             for state in M_verify.states.values()}
+    N_verify = NFA(list(M_verify.states), M_verify.input_alphabet, delta,
+                   M_verify.start_state.name,
+                   [state.name for state in M_verify.final_states])
+    tokens = [symbol for sequence in make_steps(count) for symbol in sequence]
+
+    print("FA vs NFA (%d tokens)" % len(tokens))
+    for name, M in (("FA", M_verify), ("NFA", N_verify)):
+        start = time.perf_counter()
+        M.reset()
+        for symbol in tokens:
+            if not M.transition(symbol):
+                M.reset()
+        elapsed = time.perf_counter() - start
+        print("%24s %10.3f" % (name + ".transition", elapsed))
+
+
+def main(max_size):
+    """
+    Runs all benchmarks for traces up to 'max_size' characters
+    """
+    sizes = [size for size in SIZES if size <= max_size]
+    bench_lexer(sizes)
+    bench_spans(sizes)
+    bench_product(sizes)
+    bench_nfa(100000)
+    if np is not None:
+        bench_batch(100000)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(float(sys.argv[1])))
+    else:
+        main(SIZES[-1])
@@ -0,0 +1,77 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+import hashlib
+import os
+import pickle
+import sys
+
+# Hashes of the source files of the automaton classes, by path
+SOURCE_HASHES = {}
+
+
+def load_or_create(cls, definition, cache_dir):
+    """
+    Load an automaton from the on-disk cache, or create it with
+    cls(*definition) and store it in the cache. Loading skips validating the
+    definition, but costs hashing it and unpickling the automaton, so it only
+    pays off for large definitions.
+    cls:        The class of the automaton, e.g. PDA or TM
+    definition: The arguments of the constructor
+    cache_dir:  The directory of the cache
+    returns: The automaton
+    """
+    path = cache_path(cls, definition, cache_dir)
+    automaton = load_cached(path)
+    if automaton is None:
+        automaton = cls(*definition)
+        store_cached(path, automaton)
+    return automaton
+
+
+def cache_path(cls, definition, cache_dir):
+    """
+    Determine the cache file of an automaton definition. The key hashes the
+    definition together with the source of the module of 'cls', so cached
+    automata are invalidated whenever the implementation changes.
+    """
+    source = os.path.abspath(sys.modules[cls.__module__].__file__)
+    if source not in SOURCE_HASHES:
+        with open(source, 'rb') as f:
+            SOURCE_HASHES[source] = hashlib.sha256(f.read()).digest()
+
+    key = hashlib.sha256(SOURCE_HASHES[source] +
+                         repr(definition).encode('utf-8'))
+    return os.path.join(cache_dir, key.hexdigest() + '.pickle')
+
+
+def load_cached(path):
+    """
+    Load a cached automaton
+    returns: The automaton, or None if it is not (validly) cached
+    """
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, AttributeError, pickle.UnpicklingError):
+        return None
+
+
+def store_cached(path, automaton):
+    """
+    Store an automaton in the cache. Failing to do so is not an error.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.' + str(os.getpid())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(automaton, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
@@ -8,7 +8,7 @@
 # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 from FA import FA
-import string
+from array import array
 import sys
 
 
@@ -34,22 +34,35 @@ def create_fa():
                         'digit': 'SYMBOL'}}
     s = 'START'
     F = ['SPACE', 'MLEFT', 'MRIGHT', 'READ', 'WRITE', 'BLANK', 'LEM', 'SYMBOL']
+    classes = {'character': [('a', 'z'), ('A', 'Z')],
+               'digit': [('0', '9')]}
 
-    M = FA(Q, Sigma, delta, s, F, verbose=False)
+    M = FA(Q, Sigma, delta, s, F, verbose=False, classes=classes)
 
     return M
 
 
-def char_type(char):
+def lex(fa, trace):
     """
-    Returns the type of a character found in the trace
+    Lazily tokenizes the trace, assigning a state to every character
+    fa: The finite automaton
+    trace: A single string, or any iterable of characters
+    returns: A generator of tuples containing first the token then the state.
+    If something goes wrong the generator calls sys.exit()
     """
-    if char in string.digits:
-        return (True, 'digit')
-    elif char in string.ascii_letters:
-        return (True, 'character')
-    else:
-        return (False, char)
+
+    """
+    The trace is walked exactly once with an iterator, so no copies of the
+    remaining trace are made. The fa classifies every character itself using
+    its character classes. Every character starts a new token, so the fa is
+    reset before each transition.
+    """
+
+    for char in trace:
+        fa.reset()
+        if not fa.transition_char(char):
+            sys.exit()
+        yield (char, fa.state_val())
 
 
 def lexer(fa, trace):
@@ -60,33 +73,69 @@ def lexer(fa, trace):
     returns: A list of tuples containing first the token then the state.
     If something goes wrong the function should call sys.exit()
     """
+    fa.reset()
+    return list(lex(fa, trace))
 
+
+def lex_spans(fa, trace):
     """
-    The lexer is implemented by looping over the elements of a trace
-    until it's empty. In the loop
-    the fa will be reset when the automata is in a final
-    state AND is not the SYMBOL state, therefore continuing the
-    tokenization. When there are no more symbols to
-    tokenize, the loop will stop. An exception is when
-    a symbol is found which is not in Sigma, then
-    sys.exit() call will be made.
+    Tokenizes the trace by maximal munch, emitting one token per longest
+    match instead of one per character
+    fa: The finite automaton
+    trace: A single string
+    returns: A tuple of three parallel arrays: the start offsets, the end
+    offsets (exclusive) and the token-kind ids. A token-kind id is the id of
+    the final state of the fa in which the token was matched, see
+    fa.state_names. If something goes wrong the function calls sys.exit()
     """
 
-    fa.reset()
-    token = []
-    while (trace):
-        if char_type(trace[0]):
-            fa.reset()
+    """
+    From every token start the fa is run as far as it can go, remembering
+    the last position at which it was in a final state. That position ends
+    the token and the next token starts from there with a reset fa.
+    """
 
-        step = fa.transition(char_type(trace[0])[1])
-        if step is False:
+    starts = array('q')
+    ends = array('q')
+    kinds = array(kind_typecode(fa))
+
+    length = len(trace)
+    idx = 0
+    while idx < length:
+        fa.reset()
+        end = -1
+        kind = None
+        pos = idx
+        while pos < length:
+            symbol_id = fa.classify(trace[pos])
+            if symbol_id < 0 or not fa.transition_id(symbol_id):
+                break
+            pos += 1
+            if fa.is_final():
+                end = pos
+                kind = fa.current_id
+
+        if end < 0:
             sys.exit()
-        else:
-            token.append((trace[0], fa.state_val()))
-            trace = trace[1:]
 
-    else:
-        return token
+        starts.append(idx)
+        ends.append(end)
+        kinds.append(kind)
+        idx = end
+
+    return starts, ends, kinds
+
+
+def kind_typecode(fa):
+    """
+    Choose the smallest array typecode that holds every token-kind id, i.e.
+    every state id of the fa
+    """
+    if len(fa.state_names) <= 0xFF:
+        return 'B'
+    if len(fa.state_names) <= 0xFFFF:
+        return 'H'
+    return 'L'
 
 
 def main(path):
@@ -0,0 +1,309 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from NFA import NFA
+import sys
+
+# Compiles regular expressions to minimized finite automata (FA).
+#
+# Supported syntax:
+#   abc        literal characters, including ⊢ and ⊔
+#   .          any character
+#   [a-z0-9_]  character classes with ranges, [^...] for the complement
+#   \d \w \s   ASCII digits, word characters and whitespace
+#   \c         the literal character c, for any metacharacter c
+#   a|b        alternation
+#   (ab)       grouping
+#   * + ?      repetition: zero or more, one or more, zero or one
+#   {m} {m,} {m,n}
+#              repetition: exactly m, at least m, between m and n times
+
+MAX_CHAR = 0x10FFFF
+ESCAPES = {'d': [('0', '9')],
+           'w': [('a', 'z'), ('A', 'Z'), ('0', '9'), ('_', '_')],
+           's': [(' ', ' '), ('\t', '\r')]}
+METACHARS = '.[]()|*+?{}\\'
+
+# Compiled automata, keyed by pattern
+cache = {}
+
+
+def compile_regex(pattern):
+    """
+    Compiles the regular expression 'pattern' to a minimized FA. The FA of a
+    pattern is compiled once and shared afterwards, so reset it before use.
+    pattern: The regular expression (string)
+    returns: An FA, whose symbols are character classes
+    """
+    if pattern not in cache:
+        cache[pattern] = Parser(pattern).to_nfa().determinize().minimize()
+    return cache[pattern]
+
+
+def match(pattern, text):
+    """
+    Checks whether the regular expression 'pattern' matches all of 'text'
+    returns: True if it does, False otherwise
+    """
+    fa = compile_regex(pattern)
+    fa.reset()
+    for char in text:
+        if not fa.transition_char(char):
+            return False
+    return fa.is_final()
+
+
+class Parser:
+    """
+    Recursive descent parser and Thompson construction for a regular
+    expression
+    """
+
+    def __init__(self, pattern):
+        """
+        Parses 'pattern' into a syntax tree of tuples: ('chars', ranges),
+        ('cat', nodes), ('alt', nodes), ('star', node) and ('empty',)
+        """
+        self.pattern = pattern
+        self.pos = 0
+        self.tree = self.parse_alt()
+        if self.pos < len(pattern):
+            self.error("Unexpected \'" + pattern[self.pos] + "\'")
+
+    def error(self, message):
+        sys.exit("RegexError: " + message + " at position " + str(self.pos) +
+                 " of \'" + self.pattern + "\'")
+
+    def peek(self):
+        if self.pos < len(self.pattern):
+            return self.pattern[self.pos]
+        return None
+
+    def take(self):
+        if self.pos >= len(self.pattern):
+            self.error("Unexpected end of pattern")
+        self.pos += 1
+        return self.pattern[self.pos - 1]
+
+    def parse_alt(self):
+        branches = [self.parse_cat()]
+        while self.peek() == '|':
+            self.take()
+            branches.append(self.parse_cat())
+        return branches[0] if len(branches) == 1 else ('alt', branches)
+
+    def parse_cat(self):
+        nodes = []
+        while self.peek() is not None and self.peek() not in '|)':
+            nodes.append(self.parse_repeat())
+        if not nodes:
+            return ('empty',)
+        return nodes[0] if len(nodes) == 1 else ('cat', nodes)
+
+    def parse_repeat(self):
+        node = self.parse_atom()
+        while self.peek() is not None and self.peek() in '*+?{':
+            char = self.take()
+            if char == '*':
+                node = ('star', node)
+            elif char == '+':
+                node = ('cat', [node, ('star', node)])
+            elif char == '?':
+                node = ('alt', [node, ('empty',)])
+            else:
+                low, high = self.parse_bounds()
+                nodes = [node] * low
+                if high is None:
+                    nodes.append(('star', node))
+                else:
+                    nodes += [('alt', [node, ('empty',)])] * (high - low)
+                node = ('cat', nodes) if nodes else ('empty',)
+        return node
+
+    def parse_bounds(self):
+        """
+        Parses the 'm}', 'm,}' or 'm,n}' following a '{'
+        returns: A tuple (m, n), where n is None if unbounded
+        """
+        low = self.parse_number()
+        high = low
+        if self.peek() == ',':
+            self.take()
+            high = None if self.peek() == '}' else self.parse_number()
+        if self.take() != '}':
+            self.error("Expected \'}\'")
+        if high is not None and high < low:
+            self.error("Invalid repetition bounds")
+        return low, high
+
+    def parse_number(self):
+        start = self.pos
+        while self.peek() is not None and self.peek().isdigit():
+            self.take()
+        if start == self.pos:
+            self.error("Expected a number")
+        return int(self.pattern[start:self.pos])
+
+    def parse_atom(self):
+        char = self.take()
+        if char == '(':
+            node = self.parse_alt()
+            if self.take() != ')':
+                self.error("Expected \')\'")
+            return node
+        if char == '[':
+            return ('chars', self.parse_class())
+        if char == '.':
+            return ('chars', [(0, MAX_CHAR)])
+        if char == '\\':
+            return ('chars', self.parse_escape())
+        if char in METACHARS:
+            self.pos -= 1
+            self.error("Unexpected \'" + char + "\'")
+        return ('chars', [(ord(char), ord(char))])
+
+    def parse_escape(self):
+        char = self.take()
+        if char in ESCAPES:
+            return [(ord(first), ord(last)) for first, last in ESCAPES[char]]
+        return [(ord(char), ord(char))]
+
+    def parse_class(self):
+        """
+        Parses the contents of a character class following a '['
+        returns: A list of (first, last) code point ranges
+        """
+        negate = self.peek() == '^'
+        if negate:
+            self.take()
+
+        ranges = []
+        while self.peek() != ']':
+            char = self.take()
+            if char == '\\':
+                members = self.parse_escape()
+            else:
+                members = [(ord(char), ord(char))]
+            if self.peek() == '-' and len(members) == 1 and \
+                    self.pattern[self.pos + 1:self.pos + 2] not in ('', ']'):
+                self.take()
+                last = self.take()
+                if last == '\\':
+                    last = self.take()
+                if ord(last) < members[0][0]:
+                    self.error("Invalid range")
+                members = [(members[0][0], ord(last))]
+            ranges += members
+        self.take()
+
+        if negate:
+            complement = []
+            first = 0
+            for low, high in sorted(ranges):
+                if low > first:
+                    complement.append((first, low - 1))
+                first = max(first, high + 1)
+            if first <= MAX_CHAR:
+                complement.append((first, MAX_CHAR))
+            ranges = complement
+        return ranges
+
+    def alphabet(self):
+        """
+        Splits all characters used in the pattern into the fewest symbols
+        such that every character class is a union of symbols. Characters
+        belonging to exactly the same classes share a symbol.
+        returns: A tuple (symbols, classes, members) where members maps every
+        class (by id) to its list of symbols
+        """
+        char_sets = []
+        todo = [self.tree]
+        while todo:
+            node = todo.pop()
+            if node[0] == 'chars':
+                char_sets.append(node[1])
+            elif node[0] in ('cat', 'alt'):
+                todo += node[1]
+            elif node[0] == 'star':
+                todo.append(node[1])
+
+        bounds = sorted({low for ranges in char_sets for low, _ in ranges} |
+                        {high + 1 for ranges in char_sets
+                         for _, high in ranges})
+        signatures = {}
+        for low, high in zip(bounds, bounds[1:]):
+            signature = tuple(idx for idx, ranges in enumerate(char_sets)
+                              if any(first <= low < last + 1
+                                     for first, last in ranges))
+            if signature:
+                signatures.setdefault(signature, []).append((low, high - 1))
+
+        symbols = []
+        classes = {}
+        members = {}
+        for signature, ranges in signatures.items():
+            if len(ranges) == 1 and ranges[0][0] == ranges[0][1] and \
+                    chr(ranges[0][0]) != "ϵ":
+                symbol = chr(ranges[0][0])
+            else:
+                symbol = ",".join(chr(low) + "-" + chr(high)
+                                  for low, high in ranges)
+                classes[symbol] = [(chr(low), chr(high))
+                                   for low, high in ranges]
+            symbols.append(symbol)
+            for idx in signature:
+                members.setdefault(id(char_sets[idx]), []).append(symbol)
+
+        return symbols, classes, members
+
+    def to_nfa(self):
+        """
+        Builds the NFA of the pattern with Thompson's construction
+        returns: An NFA
+        """
+        symbols, classes, members = self.alphabet()
+        delta = {}
+
+        def new_state():
+            state = 'n' + str(len(delta))
+            delta[state] = {}
+            return state
+
+        def add(state, symbol, next_state):
+            delta[state].setdefault(symbol, []).append(next_state)
+
+        def build(node, start, end):
+            kind = node[0]
+            if kind == 'empty':
+                add(start, "ϵ", end)
+            elif kind == 'chars':
+                for symbol in members.get(id(node[1]), []):
+                    add(start, symbol, end)
+            elif kind == 'cat':
+                for child in node[1][:-1]:
+                    middle = new_state()
+                    build(child, start, middle)
+                    start = middle
+                build(node[1][-1], start, end)
+            elif kind == 'alt':
+                for child in node[1]:
+                    build(child, start, end)
+            elif kind == 'star':
+                loop = new_state()
+                add(start, "ϵ", loop)
+                add(loop, "ϵ", end)
+                inner = new_state()
+                build(node[1], loop, inner)
+                add(inner, "ϵ", loop)
+
+        start = new_state()
+        end = new_state()
+        build(self.tree, start, end)
+
+        return NFA(list(delta), symbols, delta, start, [end], classes=classes)
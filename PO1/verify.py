@@ -51,15 +51,18 @@ def verify_steps(fa, lexed_trace):
     """
     The verification function steps through the lexed trace and feeds the token
     portion of tuple to the fa. Either filter out SPACE tokens or adjust the FA
+    Every token is interned once, to follow it with fa.transition_id
     fa: The finite automaton
-    lexed_trace: A list of tuples of the form (event, token).
+    lexed_trace: An iterable of tuples of the form (event, token), such as
+                 the generator returned by lexer.lex().
     returns: True if the trace is valid, false otherwise.
     """
+    symbol_id = fa.symbol_ids.get
+    transition_id = fa.transition_id
+
     fa.reset()
-    steps = [step[1] for step in lexed_trace]
-    for step in steps:
-        result = fa.transition(step)
-        if (not result):
+    for _, step in lexed_trace:
+        if not transition_id(symbol_id(step, -1)):
             return False
 
     if (fa.is_final() is True):
@@ -68,10 +71,201 @@ def verify_steps(fa, lexed_trace):
         False
 
 
-def main(path):
+def verify_kinds(fa, kinds, kind_names):
+    """
+    Feeds the token-kind column produced by lexer.lex_spans to the fa without
+    creating a tuple per token. The tokens are longest matches, so a SYMBOL
+    may have several characters, unlike in lexer.lexer. validate agrees with
+    it on a product FA created with maximal_munch.
+    fa: The finite automaton
+    kinds: An iterable of token-kind ids
+    kind_names: The token name of every kind id, i.e. the state_names of the
+                lexer fa
+    returns: True if the trace is valid, False otherwise.
+    """
+    symbol_ids = [fa.symbol_ids.get(name, -1) for name in kind_names]
+
+    fa.reset()
+    for kind in kinds:
+        symbol_id = symbol_ids[kind]
+        if symbol_id < 0 or not fa.transition_id(symbol_id):
+            return False
+
+    return fa.is_final()
+
+
+def create_product_fa(lexer_fa, verify_fa, maximal_munch=False):
+    """
+    Composes the lexer FA and the step verification FA into a single product
+    FA that reads the character classes of the lexer directly
+    lexer_fa: The finite automaton for trace tokenization (lexer.create_fa)
+    verify_fa: The finite automaton for step verification (create_fa)
+    maximal_munch: Tokenize like lexer.lex_spans, with one token per longest
+                   match, instead of one token per character like
+                   lexer.lexer, which makes a SYMBOL of several characters
+                   invalid
+    returns: The minimized product FA
+    """
+
     """
-    Reads multiple traces from the file at 'path' and feeds them first to the
-    lexer and then to verify_steps.
+    A product state pairs the state of verify_fa with the state of the lexer
+    in the token read so far, and is named after both. Per character, the
+    lexer resets before every character, so its half of a product state is
+    always its start state and only the state of verify_fa is remembered. By
+    maximal munch, a character the lexer cannot add to the token first feeds
+    the token to verify_fa and then starts the next one. This does not look
+    back for shorter matches, so every prefix of a token has to be a token
+    itself, as for lexer.create_fa.
+    """
+
+    lexer_start = lexer_fa.start_state
+    lexer_final = set(state.name for state in lexer_fa.final_states)
+    verify_final = set(state.name for state in verify_fa.final_states)
+
+    def name(pair):
+        state_name, token = pair
+        if token is None:
+            return state_name
+        return state_name + '/' + token
+
+    def token_end(state_name, token):
+        # The state of verify_fa after 'token', or None if it has none
+        if token not in lexer_final:
+            return None
+        return verify_fa.states[state_name].transition_table.get(token)
+
+    def new_token(state_name, symbol):
+        # The product state after starting a new token with 'symbol'
+        token = lexer_start.transition_table.get(symbol)
+        if token is None:
+            return None
+        if maximal_munch:
+            return state_name, token
+        end_name = token_end(state_name, token)
+        if end_name is None:
+            return None
+        return end_name, None
+
+    Sigma = list(lexer_fa.input_alphabet)
+    pairs = [(verify_fa.start_state.name, None)]
+    found = set(pairs)
+    delta = {}
+    F = []
+    for pair in pairs:
+        state_name, token = pair
+        if token is None:
+            end_name = state_name
+            table = {}
+        else:
+            end_name = token_end(state_name, token)
+            table = lexer_fa.states[token].transition_table
+        if end_name in verify_final:
+            F.append(name(pair))
+
+        delta[name(pair)] = {}
+        for symbol in Sigma:
+            if symbol in table:
+                next_pair = (state_name, table[symbol])
+            elif end_name is not None:
+                next_pair = new_token(end_name, symbol)
+            else:
+                continue
+            if next_pair is None:
+                continue
+
+            delta[name(pair)][symbol] = name(next_pair)
+            if next_pair not in found:
+                found.add(next_pair)
+                pairs.append(next_pair)
+    Q = [name(pair) for pair in pairs]
+
+    M = FA(Q, Sigma, delta, Q[0], F, verbose=False,
+           classes=lexer_fa.char_classes)
+
+    return M.minimize()
+
+
+def validate(fa, trace):
+    """
+    Lexes and verifies a raw trace in a single pass over its characters. The
+    tokens are those of the product FA: one per character by default, like
+    verify_steps on lexer.lexer, or one per longest match if it was created
+    with maximal_munch, like verify_kinds on lexer.lex_spans.
+    fa: The product FA (create_product_fa)
+    trace: A single string, or any iterable of characters
+    returns: A tuple (accepted, offset) where offset is the index of the
+    character at which rejection became certain, the length of the trace if it
+    ended outside a final state, or -1 if the trace is valid.
+    """
+    fa.reset()
+    offset = 0
+    for char in trace:
+        if not fa.transition_char(char):
+            return False, offset
+        offset += 1
+
+    if fa.is_final():
+        return True, -1
+    return False, offset
+
+
+def validate_trie(fa, traces):
+    """
+    Validates many traces by walking a trie of their characters, so every
+    prefix that traces share is fed to the fa only once. The configuration of
+    the fa is saved at every branch of the trie and restored for each of its
+    children.
+    fa: The fused lexer and step verifier, see create_product_fa
+    traces: A list of traces (strings)
+    returns: A list with True for every valid trace, False otherwise.
+    """
+    # Every node of the trie is a pair of a dictionary of children, by
+    # character, and a list of the indices of the traces that end in it
+    root = ({}, [])
+    for idx, trace in enumerate(traces):
+        node = root
+        for char in trace:
+            node = node[0].setdefault(char, ({}, []))
+        node[1].append(idx)
+
+    results = [False] * len(traces)
+    fa.reset()
+    todo = [(fa.snapshot(), None, root)]
+    while todo:
+        snapshot, char, node = todo.pop()
+        fa.restore(snapshot)
+        if char is not None and not fa.feed_chars(char):
+            # All traces below the node are invalid
+            continue
+
+        # Follow the trie without saving the configuration up to a branch
+        while True:
+            children, ends = node
+            if ends:
+                result = fa.result()
+                for idx in ends:
+                    results[idx] = result
+            if len(children) != 1:
+                break
+            (char, node), = children.items()
+            if not fa.feed_chars(char):
+                children = {}
+                break
+
+        if children:
+            snapshot = fa.snapshot()
+            todo.extend((snapshot, char, child)
+                        for char, child in children.items())
+
+    return results
+
+
+def main(path, trie=False):
+    """
+    Reads multiple traces from the file at 'path' and feeds them to the lexer
+    and to the fused lexer and step verifier.
+    trie: Validate the traces with validate_trie, feeding shared prefixes
+          only once
     """
 
     fo = open(path, encoding='utf-8')
@@ -80,19 +274,21 @@ def main(path):
     fo.close()
 
     M_lexer = lexer.create_fa()
-    M_verify = create_fa()
+    M_product = create_product_fa(M_lexer, create_fa())
+
+    if trie:
+        verdicts = validate_trie(M_product, traces)
+    else:
+        verdicts = [validate(M_product, trace)[0] for trace in traces]
 
-    for trace in traces:
-        M_lexer.reset()
-        M_verify.reset()
+    for trace, verdict in zip(traces, verdicts):
         print("Trace : \"" + trace + "\"")
-        lexed_trace = lexer.lexer(M_lexer, trace)
         print("Lexer : " + str(lexer.lexer(M_lexer, trace)))
-        print("Verify: " + str(verify_steps(M_verify, lexed_trace)))
+        print("Verify: " + str(verdict))
 
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        sys.exit('RuntimeError: Use `python3 verify.py traces.txt`')
+        sys.exit('RuntimeError: Use `python3 verify.py traces.txt [--trie]`')
     source = sys.argv[1]
-    main(source)
+    main(source, trie='--trie' in sys.argv[2:])
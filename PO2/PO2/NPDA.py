@@ -0,0 +1,468 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+import sys
+
+
+class NPDA:
+    """
+    Nondeterministic Pushdown Automaton (NPDA), run breadth-first on the set
+    of all configurations it can be in
+    """
+
+    def __init__(self, Q, Sigma, Gamma, delta, s, F, pda_type="final_state",
+                 verbose=False, max_configurations=100000):
+        """
+        Creates the NPDA object and performs input sanitization
+        Q:       The finite set of states (list or set of strings)
+        Sigma:   The input alphabet (list of set of strings)
+        Gamma:   The stack alphabet (list of set of strings)
+        delta:   The transition relation, a list of relation tuples containing
+                 elements of the form: ((Q, Sigma, Gamma), (Q, [Gamma*])).
+                 The input symbol may be replaced with 'ϵ' for a move that
+                 reads no input, 'Gamma' in the left-hand side with 'ϵ' for a
+                 move that does not pop the stack and '[Gamma*]' in the
+                 right-hand side with 'ϵ' for a move that pushes nothing. Any
+                 number of relations may share a left-hand side.
+        s:       The start state (string)
+        F:       The finite set of final states (list or set of strings)
+        pda_type:Specification of the type of NPDA: "final_state" or
+                 "empty_stack"
+        verbose: Indicator of whether to print a warning when no configuration
+                 is left
+        max_configurations:
+                 The maximum amount of live configurations. A run that needs
+                 more stops, and its result() is None rather than a wrong
+                 answer.
+        """
+
+        # Verify proper use of states
+        if len(Q) != len(set(Q)):
+            sys.exit("StateError: Q contains duplicates")
+
+        if s not in Q:
+            sys.exit("StateError: Starting state \'" + s + "\' not in Q")
+
+        for state in F:
+            if state not in Q:
+                sys.exit("StateError: Final state \'" + state + "\' not in Q")
+
+        if pda_type not in ("final_state", "empty_stack"):
+            sys.exit("TypeError: Unknown pda_type \'" + pda_type + "\'")
+
+        # Verify proper use of transitions
+        for lhs, rhs in delta:
+            # Left-hand side
+            state, input_symbol, top_stack = lhs
+            if state not in Q:
+                sys.exit("TransitionError: State \'" + state +
+                         "\' not in Q")
+            if input_symbol not in Sigma and input_symbol != "ϵ":
+                sys.exit("TransitionError: Symbol \'" + input_symbol +
+                         "\' for relation \'" + str((lhs, rhs)) +
+                         "\' not in Sigma")
+            if top_stack not in Gamma and top_stack != "ϵ":
+                sys.exit("TransitionError: Stack-symbol \'" +
+                         top_stack + "\' for relation \'" +
+                         str((lhs, rhs)) + "\' not in Gamma")
+            # Right-hand side
+            state, top_stack_list = rhs
+            if state not in Q:
+                sys.exit("TransitionError: State \'" + state +
+                         "\' not in Q")
+            if top_stack_list != "ϵ":
+                for stack_symbol in top_stack_list:
+                    if stack_symbol not in Gamma:
+                        sys.exit("TransitionError: Stack-symbol \'" +
+                                 stack_symbol +
+                                 "\' for relation \'" +
+                                 str((lhs, rhs)) + "\' not in Gamma")
+
+        if max_configurations < 1:
+            sys.exit("ConfigurationError: At least one configuration should "
+                     "be allowed")
+
+        # Group the relations by state, input symbol and stack top. The
+        # symbols to push are stored bottom first, unfortunately Kozen
+        # notation has the top of the stack on the left.
+        self.relations = {state: {} for state in Q}
+        for (state, input_symbol, top_stack), (next_state, push) in delta:
+            push = () if push == "ϵ" else tuple(reversed(push))
+            self.relations[state].setdefault(
+                (input_symbol, top_stack), []).append((next_state, push))
+
+        # Retain and assign variables
+        self.pda_type = pda_type
+        self.verbose = verbose
+        self.input_alphabet = Sigma
+        self.stack_alphabet = Gamma
+        self.start_state = s
+        self.final_states = set(F)
+        self.max_configurations = max_configurations
+        self.dead_states = self.find_dead_states()
+        self.pop_costs = self.find_pop_costs()
+
+        # Beyond this many symbols that cost no input to remove, the top of
+        # a stack was pushed by repeating a state and stack top, see key()
+        longest_push = max([len(push) for table in self.relations.values()
+                            for moves in table.values()
+                            for _, push in moves] + [1])
+        self.max_free_symbols = len(Q) * len(set(Gamma) | {'⊥'}) * \
+            longest_push + 1
+        self.reset()
+
+    def find_dead_states(self):
+        """
+        Find the states from which no final state is reachable, ignoring the
+        stack. Configurations of a "final_state" NPDA in such a state can
+        never accept anymore and are dropped. An "empty_stack" NPDA does not
+        depend on its state, so it has none.
+        returns: A set of state names
+        """
+        if self.pda_type != "final_state":
+            return set()
+
+        predecessors = {state: set() for state in self.relations}
+        for state, table in self.relations.items():
+            for moves in table.values():
+                for next_state, _ in moves:
+                    predecessors[next_state].add(state)
+
+        alive = set(self.final_states)
+        todo = list(alive)
+        while todo:
+            for prev_state in predecessors[todo.pop()]:
+                if prev_state not in alive:
+                    alive.add(prev_state)
+                    todo.append(prev_state)
+
+        return set(self.relations) - alive
+
+    def find_pop_costs(self):
+        """
+        Find for every stack symbol the least amount of input symbols that a
+        run has to read to remove it from the stack, ignoring the states.
+        Symbols that can never be removed cost infinitely much.
+        returns: A dictionary of the costs by stack symbol
+        """
+        costs = {symbol: float('inf') for symbol in self.stack_alphabet}
+        costs['⊥'] = float('inf')
+
+        # Relations that do not pop only add to the cost, so they are left
+        # out. The costs only decrease, so this ends.
+        changed = True
+        while changed:
+            changed = False
+            for table in self.relations.values():
+                for (input_symbol, top_stack), moves in table.items():
+                    if top_stack == "ϵ":
+                        continue
+                    for _, push in moves:
+                        cost = (input_symbol != "ϵ") + \
+                            sum(costs[symbol] for symbol in push)
+                        if cost < costs[top_stack]:
+                            costs[top_stack] = cost
+                            changed = True
+
+        return costs
+
+    def step(self, configurations, input_symbol, pushed=None):
+        """
+        Follow every relation for 'input_symbol' (possibly 'ϵ') from every
+        configuration in 'configurations'
+        pushed:  A set to add the resulting configurations of relations that
+                 push to, if given
+        returns: A set of the resulting configurations
+        """
+        next_configurations = set()
+        relations = self.relations
+        dead_states = self.dead_states
+        pop_costs = self.pop_costs
+        for state, stack in configurations:
+            table = relations[state]
+            moves = []
+            if stack is not None:
+                for move in table.get((input_symbol, stack.symbol), ()):
+                    moves.append((move, stack.below))
+            for move in table.get((input_symbol, "ϵ"), ()):
+                moves.append((move, stack))
+
+            for (next_state, push), below in moves:
+                if next_state in dead_states:
+                    continue
+                for symbol in push:
+                    below = StackNode(symbol, below, pop_costs[symbol])
+                next_configurations.add((next_state, below))
+                if push and pushed is not None:
+                    pushed.add((next_state, below))
+
+        return next_configurations
+
+    def closure(self, configurations):
+        """
+        Extend 'configurations' with all configurations that are reachable
+        with moves that read no input, leaving out those that cannot change
+        the outcome, see key()
+        returns: The extended set of configurations
+        """
+        found = {}
+        todo = self.add_new(found, configurations, ())
+        while todo and not self.overflow:
+            pushed = set()
+            todo = self.add_new(found, self.step(todo, "ϵ", pushed), pushed)
+        return set(found.values())
+
+    def add_new(self, found, configurations, pushed):
+        """
+        Add the configurations of 'configurations' to the dictionary 'found',
+        by key(), unless they are pruned or an equivalent one was found
+        before. Stops the run when too many configurations are found.
+        pushed:  The configurations that were found by pushing, for which
+                 equivalent configurations are looked for
+        returns: A list of the added configurations
+        """
+        added = []
+        for configuration in configurations:
+            key = self.key(configuration, configuration in pushed)
+            if key is not None and key not in found:
+                found[key] = configuration
+                added.append(configuration)
+
+        if len(found) > self.max_configurations:
+            self.overflow = True
+            if self.verbose:
+                print("Warning: More than " + str(self.max_configurations) +
+                      " live configurations, the outcome is unknown")
+        return added
+
+    def key(self, configuration, compare_tops):
+        """
+        Determine what decides whether 'configuration' can still lead to
+        acceptance, if the amount of remaining input symbols is known.
+        Reading them removes at most the top of the stack, up to the first
+        symbol that would cost more input to remove (see find_pop_costs).
+        An "empty_stack" NPDA must remove the whole stack, so a configuration
+        with a stack that costs more can be dropped. Otherwise configurations
+        with the same state and the same top of the stack are equivalent.
+        Comparing the tops takes time, so that is only done if
+        'compare_tops' is set, for the configurations that the closure finds
+        by pushing: only those can grow the stack. For stacks that cost no
+        more than the remaining input, it is only done if they hold more
+        than max_free_symbols symbols that cost nothing to remove.
+
+        Such symbols can be removed any number of times, so the top is cut
+        off after max_free_symbols of them. A run that reads no input can
+        only push that many by repeating a state and stack top, so the top
+        below them is assumed to repeat what is above them. This bounds the
+        configurations of moves that read no input and only push, like
+        PDA.to_fa bounds the height of the stack.
+        returns: The configuration itself, a tuple of its state and the top
+        of its stack, or None if it can be dropped
+        """
+        remaining = self.remaining
+        state, stack = configuration
+        if remaining is None or stack is None:
+            return configuration
+        max_free_symbols = self.max_free_symbols
+        if stack.cost > remaining and self.pda_type == "empty_stack":
+            return None
+        if not compare_tops:
+            return configuration
+        if stack.cost <= remaining and \
+                stack.height <= remaining + max_free_symbols:
+            # A stack this low is bounded already. A higher one holds more
+            # than max_free_symbols free symbols, as at most 'remaining' of
+            # its symbols cost any input.
+            return configuration
+
+        pop_costs = self.pop_costs
+        top = []
+        cost = 0
+        free_symbols = 0
+        while cost <= remaining and free_symbols < max_free_symbols:
+            symbol = stack.symbol
+            top.append(symbol)
+            if pop_costs[symbol]:
+                cost += pop_costs[symbol]
+            else:
+                free_symbols += 1
+            stack = stack.below
+        return state, tuple(top)
+
+    def close(self):
+        """
+        Take the moves that read no input from the start configuration, which
+        reset() leaves until the amount of input is known
+        """
+        if not self.closed:
+            self.configurations = self.closure(self.configurations)
+            self.closed = True
+
+    def transition(self, symbol):
+        """
+        Follow the input 'symbol' from every current configuration
+        returns: True if any configuration is left, False otherwise
+        """
+        self.close()
+        if self.configurations and not self.overflow:
+            configurations = self.step(self.configurations, symbol)
+            if self.remaining is not None:
+                self.remaining -= 1
+            self.configurations = self.closure(configurations)
+
+            if self.verbose and not self.configurations:
+                print("Warning: No configuration has a transition for "
+                      "input-symbol \'" + symbol + "\'")
+
+        return bool(self.configurations) and not self.overflow
+
+    def transition_all(self, list_of_symbols):
+        """
+        Run NPDA against the complete input 'list_of_symbols', stopping as soon
+        as no configuration is left
+        returns: True if the input is accepted, False otherwise, or None if
+        there were too many configurations to tell
+        """
+        self.feed(list_of_symbols, len(list_of_symbols))
+        return self.result()
+
+    def feed(self, symbols, remaining=None):
+        """
+        Continue the run with the next chunk 'symbols' of the input. Call
+        reset() before the first chunk and result() after the last one.
+        remaining: The amount of input symbols from the start of this chunk
+                   to the end of the input, if known. Configurations that
+                   cannot change the outcome are then dropped, see key().
+                   Without it, moves that read no input and only push may
+                   exceed max_configurations.
+        returns: True if any configuration is left, False otherwise
+        """
+        if remaining is not None:
+            self.remaining = remaining
+        for symbol in symbols:
+            if not self.transition(symbol):
+                return False
+        self.close()
+        return bool(self.configurations) and not self.overflow
+
+    def result(self):
+        """
+        Check whether the NPDA accepts the input fed so far, according to its
+        type
+        returns: True or False, or None if the run stopped because it had
+        more than max_configurations configurations
+        """
+        self.close()
+        if self.overflow:
+            return None
+        return self.is_accepting()
+
+    def is_accepting(self):
+        """
+        Check whether any current configuration accepts the input read so far
+        """
+        self.close()
+        if self.pda_type == "final_state":
+            return any(state in self.final_states
+                       for state, _ in self.configurations)
+        return any(stack is None for _, stack in self.configurations)
+
+    def state_val(self):
+        """
+        returns: A set of the current configurations, as tuples of the state
+        name and the stack, top first
+        """
+        self.close()
+        return {(state, tuple(iter_stack(stack)))
+                for state, stack in self.configurations}
+
+    def snapshot(self):
+        """
+        Save the current configurations, to continue from them later with
+        restore(). The stacks are persistent, so this copies nothing. Moves
+        that read no input which were left by reset() are still left, until
+        the amount of input is known.
+        returns: The saved configurations
+        """
+        return self.configurations, self.closed, self.remaining, \
+            self.overflow
+
+    def restore(self, snapshot):
+        """
+        Continue from configurations saved with snapshot()
+        """
+        self.configurations, self.closed, self.remaining, self.overflow = \
+            snapshot
+
+    def reset(self):
+        """
+        Start over from the start configuration. Its moves that read no input
+        are only taken once it is known how much input follows, see feed().
+        """
+        start = (self.start_state, StackNode('⊥', None, self.pop_costs['⊥']))
+        self.configurations = {start}
+        self.closed = False
+        self.remaining = None
+        self.overflow = False
+
+
+def iter_stack(stack):
+    """
+    returns: A generator of the symbols of the linked 'stack', top first
+    """
+    while stack is not None:
+        yield stack.symbol
+        stack = stack.below
+
+
+class StackNode:
+    """
+    Node of a persistent linked stack of a Nondeterministic Pushdown
+    Automaton (NPDA). Pushing creates a node on top of the old stack, which is
+    never changed, so all configurations share the common parts of their
+    stacks. The empty stack is None.
+    """
+    __slots__ = ('symbol', 'below', 'height', 'hash', 'cost')
+
+    def __init__(self, symbol, below, cost=0):
+        """
+        symbol: The top stack symbol
+        below:  The StackNode below it, or None
+        cost:   The least amount of input symbols to read to remove the top
+                symbol, see NPDA.find_pop_costs
+        """
+        self.symbol = symbol
+        self.below = below
+        if below is None:
+            self.height = 1
+            self.hash = hash(symbol)
+            self.cost = cost
+        else:
+            self.height = below.height + 1
+            self.hash = hash((symbol, below.hash))
+            self.cost = below.cost + cost
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        """
+        Compare stacks symbol by symbol, down to the first shared node
+        """
+        if not isinstance(other, StackNode):
+            return NotImplemented
+        if self.hash != other.hash or self.height != other.height:
+            return False
+        stack = self
+        while stack is not other:
+            if stack.symbol != other.symbol:
+                return False
+            stack = stack.below
+            other = other.below
+        return True
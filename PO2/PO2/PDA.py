@@ -7,8 +7,24 @@
 #   license.                                          #
 # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
+from array import array
+from itertools import chain, repeat
+import copy
+import os
 import sys
 
+# On-disk cache of validated and compiled automata, see PDA.cached()
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         '__pycache__', 'automata')
+
+# The finite automata and the automaton cache of PO1, used by PDA.to_fa()
+# and PDA.cached()
+PO1_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       os.pardir, os.pardir, 'PO1')
+
+# FA state for configurations above the stack bound of PDA.to_fa()
+OVERFLOW = "overflow"
+
 
 class PDA:
     """
@@ -16,7 +32,7 @@ class PDA:
     """
 
     def __init__(self, Q, Sigma, Gamma, delta, s, F, pda_type="final_state",
-                 verbose=False):
+                 verbose=False, stack_engine="auto"):
         """
         Creates the PDA object and performs input sanitization
         Q:       The finite set of states (list or set of strings)
@@ -32,6 +48,11 @@ class PDA:
                  "empty_stack"
         verbose: Indicator of whether to print the new configuration after a
                  transition
+        stack_engine:
+                 How the stack is stored: "list", "array" (interned symbol
+                 ids), "rle" (run-length encoded symbol ids), "counter" (see
+                 find_counter_symbol) or "auto" for "counter" if possible
+                 and "array" otherwise
         """
 
         # Verify proper use of states
@@ -73,17 +94,16 @@ class PDA:
                                  "\' for relation \'" +
                                  str((lhs, rhs)) + "\' not in Gamma")
 
+        # Group the relations by state in a single pass over delta
+        relations = {state_name: [] for state_name in Q}
+        for relation in delta:
+            relations[relation[0][0]].append(relation)
+
         # Create states
         self.states = {}
         self.final_states = []
         for state_name in Q:
-            # Check if the state-to-be has any transitions/relations
-            state_transitions = []
-            for relation in delta:
-                if relation[0][0] == state_name:
-                    state_transitions.append(relation)
-
-            new_state = State(state_name, state_transitions)
+            new_state = State(state_name, relations[state_name])
             self.states[state_name] = new_state
             if state_name in F:
                 self.final_states.append(new_state)
@@ -96,8 +116,145 @@ class PDA:
         self.start_state = self.states[s]
         self.current_state = self.start_state
 
+        # Find the states in which the outcome of a run is already certain
+        self.dead_states = self.find_dead_states()
+        self.frozen_states = {state for state in self.states.values()
+                              if not state.transition_table}
+        self.settled_states = self.dead_states | self.frozen_states
+        self.rejected_at = None
+        self.position = 0
+        self.halted = False
+        self.bounded_fa = None
+
+        # Intern the stack symbols
+        self.stack_names = ['⊥'] + [symbol for symbol in Gamma
+                                    if symbol not in ("ϵ", "⊥")]
+        self.stack_ids = {symbol: idx for idx, symbol in
+                          enumerate(self.stack_names)}
+
+        # Choose how the stack is stored and precompile the stack pushes
+        self.counter_symbol = self.find_counter_symbol()
+        if stack_engine == "auto":
+            stack_engine = "array" if self.counter_symbol is None \
+                else "counter"
+        if stack_engine not in STACK_ENGINES:
+            sys.exit("StackError: Unknown stack engine \'" + stack_engine +
+                     "\'")
+        if stack_engine == "counter" and self.counter_symbol is None:
+            sys.exit("StackError: The stack cannot be stored as a counter")
+        self.stack_type = STACK_ENGINES[stack_engine]
+        self.compile_relations()
+
         # Setup stack
-        self.stack = ['⊥']
+        self.stack = self.new_stack()
+
+    def compile_relations(self):
+        """
+        Fill the compiled transition table of every state, which links to the
+        next State object and holds the precompiled stack push of the relation.
+        It is keyed on the input symbol and the top of the stack as the stack
+        engine pops it, so the engine never converts it back to a symbol.
+        """
+        key = self.stack_type.key
+        for state in self.states.values():
+            state.compiled_table = {
+                (input_symbol, key(top_stack_symbol, self)):
+                    (self.states[next_state_name],
+                     self.stack_type.compile(new_top_stack, self),
+                     new_top_stack)
+                for (input_symbol, top_stack_symbol),
+                    (next_state_name, new_top_stack) in
+                state.transition_table.items()}
+
+    def __setstate__(self, state):
+        # The compiled tables link states to each other, which is too deep to
+        # pickle, so they are left out (see State) and rebuilt on loading
+        self.__dict__.update(state)
+        self.compile_relations()
+
+    def find_dead_states(self):
+        """
+        Find the states from which no final state is reachable, ignoring the
+        stack. A "final_state" PDA in such a state can never accept anymore.
+        An "empty_stack" PDA does not depend on its state, so it has none.
+        returns: A set of State objects
+        """
+        if self.pda_type != "final_state":
+            return set()
+
+        predecessors = {name: set() for name in self.states}
+        for state in self.states.values():
+            for next_state_name, _ in state.transition_table.values():
+                predecessors[next_state_name].add(state.name)
+
+        alive = {state.name for state in self.final_states}
+        todo = list(alive)
+        while todo:
+            for prev_state in predecessors[todo.pop()]:
+                if prev_state not in alive:
+                    alive.add(prev_state)
+                    todo.append(prev_state)
+
+        return {state for name, state in self.states.items()
+                if name not in alive}
+
+    def find_counter_symbol(self):
+        """
+        Check whether the stack can be stored as a counter: a single counting
+        stack symbol that is only ever pushed on top of copies of itself, on
+        top of a prefix of other symbols. That holds if no relation pushes the
+        counting symbol below another symbol, and a relation only pushes other
+        symbols if it did not pop the counting symbol, so when the count is 0.
+        returns: The counting stack symbol, or None if there is none that can
+        grow beyond a single copy
+        """
+        relations = [(top_stack_symbol, new_top_stack)
+                     for state in self.states.values()
+                     for (_, top_stack_symbol), (_, new_top_stack) in
+                     state.transition_table.items()]
+
+        for symbol in list(self.stack_alphabet) + ['⊥']:
+            if symbol == "ϵ":
+                continue
+
+            grows = False
+            for top_stack_symbol, new_top_stack in relations:
+                pushed = [] if new_top_stack == "ϵ" else list(new_top_stack)
+                count = 0
+                while count < len(pushed) and pushed[count] == symbol:
+                    count += 1
+                below = pushed[count:]
+                if symbol in below or (below and top_stack_symbol == symbol):
+                    break
+                if count > (1 if top_stack_symbol == symbol else 0):
+                    grows = True
+            else:
+                if grows:
+                    return symbol
+
+        return None
+
+    def new_stack(self):
+        """
+        Create the initial stack, containing only '⊥'
+        """
+        return self.stack_type(['⊥'], self)
+
+    @classmethod
+    def cached(cls, Q, Sigma, Gamma, delta, s, F, pda_type="final_state",
+               verbose=False, stack_engine="auto", cache_dir=CACHE_DIR):
+        """
+        Creates the PDA object like PDA(), but loads it from the on-disk cache
+        without validating it again if the same definition was created before
+        cache_dir: The directory of the cache
+        """
+        if PO1_DIR not in sys.path:
+            sys.path.append(PO1_DIR)
+        from cache import load_or_create
+
+        definition = (Q, Sigma, Gamma, delta, s, F, pda_type, verbose,
+                      stack_engine)
+        return load_or_create(cls, definition, cache_dir)
 
     def transition(self, symbol):
         """
@@ -105,43 +262,40 @@ class PDA:
         returns: True if succeeded, false otherwise
         """
 
-        if self.stack:
-            top_stack_symbol = self.stack.pop()
-        else:
-            top_stack_symbol = "ϵ"
+        try:
+            top = self.stack.pop()
+        except IndexError:
+            top = "ϵ"
 
         try:
-            # Lookup new state and stack top
-            new_state_name, new_top_stack = \
-                self.current_state.transition_table[(symbol, top_stack_symbol)]
+            # Lookup new state, precompiled push and stack top
+            new_state, push, new_top_stack = \
+                self.current_state.compiled_table[(symbol, top)]
 
         except KeyError:
             if self.verbose:
                 print("Warning: State \'" + self.current_state.name +
                       "\' has no transition for input-symbol \'" + symbol +
                       "\', and top stack-symbol: \'" +
-                      top_stack_symbol + "\', no changes were made.")
+                      self.stack.name(top) + "\', no changes were made.")
 
             # Reappend the removed stack symbol
-            if top_stack_symbol != "ϵ":
-                self.stack.append(top_stack_symbol)
+            if top != "ϵ":
+                self.stack.push_back(top)
 
             return False
 
         # Keep track of previous state for printing transition info
         previous_state = self.current_state
 
-        self.current_state = self.states[new_state_name]
+        self.current_state = new_state
 
-        # Add new stack symbols to existing stack. Unfortunately Kozen notation
-        # has the top of the stack on the left, while Python has it on the
-        # right --> reverse append the symbols.
-        if new_top_stack != "ϵ":
-            for element in reversed(new_top_stack):
-                self.stack.append(element)
+        # Add new stack symbols to existing stack
+        self.stack.push(push)
 
         if self.verbose:
-            used_relation = ((previous_state.name, symbol, top_stack_symbol),
+            used_relation = ((previous_state.name, symbol,
+                              self.stack.name(top)),
                              (self.current_state.name, new_top_stack))
             print("Made transition using relation: " + str(used_relation))
             stack_visual = ' '.join(reversed(self.stack))
@@ -162,15 +316,104 @@ class PDA:
         """
         return not bool(self.stack)
 
-    def transition_all(self, list_of_symbols):
+    def transition_all(self, list_of_symbols, strict=False):
         """
-        Run PDA against the complete input 'list_of_symbols'
+        Run PDA against the complete input 'list_of_symbols'. The run stops as
+        soon as the outcome is certain: in a dead state, from which no final
+        state can be reached, or in a state without relations, which the PDA
+        can never leave. After a rejection, 'rejected_at' holds the index of
+        the symbol at which it became certain, or the length of the input.
+        strict:  Reject as soon as a transition fails, instead of skipping the
+                 symbol
         returns: True if the input is accepted, False otherwise
         """
+        self.position = 0
+        self.halted = False
+        self.feed(list_of_symbols, strict)
+        return self.result()
 
-        for symbol in list_of_symbols:
-            self.transition(symbol)
+    def feed(self, symbols, strict=False, remaining=None):
+        """
+        Continue the run with the next chunk 'symbols' of the input, so an
+        input can be verified piece by piece without holding all of it in
+        memory. Call reset() before the first chunk and result() after the
+        last one, see transition_all.
+        strict:  Reject as soon as a transition fails, instead of skipping the
+                 symbol
+        remaining: Ignored, a PDA does not depend on the amount of input
+                   that follows, see NPDA.feed
+        returns: False once the outcome is certain, True otherwise
+        """
+        settled_states = self.settled_states
+        if self.halted or self.current_state in settled_states:
+            return False
+
+        if self.verbose:
+            position = self.position
+            for symbol in symbols:
+                if not self.transition(symbol) and strict:
+                    self.halted = True
+                    break
+                if self.current_state in settled_states:
+                    break
+                position += 1
+            self.position = position
+        else:
+            self.feed_quietly(symbols, strict)
+
+        return not self.halted and self.current_state not in settled_states
+
+    def feed_quietly(self, symbols, strict):
+        """
+        feed() without printing, which inlines transition() and keeps the
+        current state and stack in locals
+        """
+        settled_states = self.settled_states
+        state = self.current_state
+        stack = self.stack
+        pop, push, push_back = stack.pop, stack.push, stack.push_back
+        position = self.position
+        for symbol in symbols:
+            try:
+                top = pop()
+            except IndexError:
+                top = "ϵ"
+            try:
+                state, symbols_to_push, _ = state.compiled_table[(symbol, top)]
+            except KeyError:
+                if top != "ϵ":
+                    push_back(top)
+                if strict:
+                    self.halted = True
+                    break
+                position += 1
+                continue
+            push(symbols_to_push)
+            if state in settled_states:
+                break
+            position += 1
+        self.current_state = state
+        self.position = position
+
+    def result(self):
+        """
+        Check whether the PDA accepts the input fed so far. After a
+        rejection, 'rejected_at' holds the index of the symbol at which it
+        became certain, or the length of the input.
+        returns: True if the input is accepted, False otherwise
+        """
+        if not self.halted and self.is_accepting():
+            self.rejected_at = None
+            return True
 
+        self.rejected_at = self.position
+        return False
+
+    def is_accepting(self):
+        """
+        Check whether the PDA accepts the input read so far, according to its
+        type
+        """
         if self.is_final() and self.pda_type == "final_state":
             return True
 
@@ -179,9 +422,557 @@ class PDA:
 
         return False
 
+    def snapshot(self):
+        """
+        Save the current configuration, to continue from it later with
+        restore(), for example for every input that shares a prefix
+        returns: The saved configuration
+        """
+        return (self.current_state, self.stack.copy(), self.position,
+                self.halted)
+
+    def restore(self, snapshot):
+        """
+        Continue from a configuration saved with snapshot(), which can be
+        restored any number of times
+        """
+        self.current_state, stack, self.position, self.halted = snapshot
+        self.stack = stack.copy()
+
     def reset(self):
         self.current_state = self.start_state
-        self.stack = ['⊥']
+        self.stack = self.new_stack()
+        self.position = 0
+        self.halted = False
+
+    def to_fa(self, max_height=None, max_configurations=100000):
+        """
+        Expand the configurations (state and stack) reachable from the start
+        configuration into the states of an equivalent Finite Automaton (FA)
+        of PO1. Symbols without a relation loop on their configuration, like
+        a failed transition of the PDA.
+        max_height: Bound on the stack height. Configurations with a higher
+                    stack go to the non-final state OVERFLOW, after which the
+                    FA no longer follows the PDA. Without a bound, the FA is
+                    only built if the reachable stack height is bounded.
+        max_configurations:
+                    Give up if more configurations are reachable
+        returns: An FA, or None if the configurations could not be expanded
+        """
+        if PO1_DIR not in sys.path:
+            sys.path.append(PO1_DIR)
+        from FA import FA
+
+        # Without a bound, give up on a higher stack than this: the PDA has
+        # then repeated a state and stack top on a growing stack
+        unbounded_height = None
+        if max_height is None:
+            longest_push = max([len(new_top_stack) for state in
+                                self.states.values() for _, new_top_stack in
+                                state.transition_table.values()
+                                if new_top_stack != "ϵ"] + [1])
+            unbounded_height = len(self.states) * len(self.stack_names) * \
+                longest_push + 1
+
+        saved = self.current_state, self.stack
+        start = (self.start_state, ('⊥',))
+        names = {start: repr((self.start_state.name, start[1]))}
+        delta = {}
+        todo = [start]
+        while todo:
+            config = todo.pop()
+            table = delta[names[config]] = {}
+            for symbol in self.input_alphabet:
+                self.current_state = config[0]
+                self.stack = self.stack_type(config[1], self)
+                self.transition(symbol)
+                next_config = (self.current_state, tuple(self.stack))
+
+                height = len(next_config[1])
+                if max_height is not None and height > max_height:
+                    table[symbol] = OVERFLOW
+                    continue
+                if next_config not in names:
+                    if len(names) >= max_configurations or \
+                            (unbounded_height is not None and
+                             height > unbounded_height):
+                        self.current_state, self.stack = saved
+                        return None
+                    names[next_config] = repr((next_config[0].name,
+                                               next_config[1]))
+                    todo.append(next_config)
+                table[symbol] = names[next_config]
+        self.current_state, self.stack = saved
+
+        Q = list(names.values())
+        if any(OVERFLOW in table.values() for table in delta.values()):
+            Q.append(OVERFLOW)
+        if self.pda_type == "final_state":
+            F = [name for (state, _), name in names.items()
+                 if state in self.final_states]
+        else:
+            F = [name for (_, stack), name in names.items() if not stack]
+
+        return FA(Q, list(self.input_alphabet), delta, names[start], F)
+
+    def compile_bounded(self, max_height=None):
+        """
+        Build the FA of to_fa() that accepts() runs on instead of the PDA
+        max_height: See to_fa()
+        returns: True if the FA could be built, False otherwise
+        """
+        fa = self.to_fa(max_height)
+        self.bounded_fa = fa
+        if fa is None:
+            return False
+
+        # Stop running the FA as soon as it can no longer change state
+        symbols = range(fa.num_symbols)
+        self.bounded_settled = bytearray(
+            all(fa.table[idx * fa.num_symbols + symbol_id] in (idx, -1)
+                for symbol_id in symbols)
+            for idx in range(len(fa.state_names)))
+        return True
+
+    def accepts(self, list_of_symbols):
+        """
+        Check whether the PDA accepts the complete input 'list_of_symbols'
+        from its start configuration. After compile_bounded() this runs on
+        the FA without any stack operations, and only falls back to the PDA
+        if the input overflows the stack bound.
+        returns: True if the input is accepted, False otherwise
+        """
+        fa = self.bounded_fa
+        if fa is not None:
+            table = fa.table
+            symbol_ids = fa.symbol_ids
+            num_symbols = fa.num_symbols
+            settled = self.bounded_settled
+
+            current_id = fa.start_id
+            for symbol in list_of_symbols:
+                symbol_id = symbol_ids.get(symbol)
+                if symbol_id is not None:
+                    current_id = table[current_id * num_symbols + symbol_id]
+                    if settled[current_id]:
+                        break
+
+            if fa.state_names[current_id] != OVERFLOW:
+                return bool(fa.final_mask >> current_id & 1)
+
+        self.reset()
+        return self.transition_all(list_of_symbols)
+
+
+class PDAGroup:
+    """
+    Group of Pushdown Automata (PDA) that are run together over a single
+    stream of input symbols, chunk by chunk. A PDA drops out as soon as its
+    outcome is certain, see PDA.transition_all.
+    """
+
+    def __init__(self, pdas):
+        """
+        pdas: A list of PDA objects
+        """
+        self.pdas = pdas
+        self.reset()
+
+    def reset(self):
+        for pda in self.pdas:
+            pda.reset()
+        self.active = [pda for pda in self.pdas
+                       if pda.current_state not in pda.settled_states]
+
+    def transition(self, symbol):
+        """
+        Feed the input 'symbol' to every PDA that has not dropped out
+        returns: True if any PDA is still running, False otherwise
+        """
+        dropped = False
+        for pda in self.active:
+            pda.transition(symbol)
+            if pda.current_state in pda.settled_states:
+                dropped = True
+
+        if dropped:
+            self.active = [pda for pda in self.active
+                           if pda.current_state not in pda.settled_states]
+        return bool(self.active)
+
+    def transition_all(self, list_of_symbols):
+        """
+        Run all PDAs against the complete input 'list_of_symbols' in a single
+        pass, stopping early once every PDA has dropped out
+        returns: A list with, for every PDA, True if it accepts the input and
+        False otherwise
+        """
+        self.reset()
+        self.feed(list_of_symbols)
+        return self.result()
+
+    def feed(self, symbols, remaining=None):
+        """
+        Continue the run of all PDAs with the next chunk 'symbols' of the
+        input. Call reset() before the first chunk and result() after the
+        last one, see transition_all.
+        remaining: Ignored, see PDA.feed
+        returns: True if any PDA is still running, False otherwise
+        """
+        # The PDAs do not depend on each other, so every PDA runs over the
+        # whole chunk in its own loop, which keeps its state and stack in
+        # locals, instead of stepping all of them for every symbol
+        self.active = [pda for pda in self.active if pda.feed(symbols)]
+        return bool(self.active)
+
+    def result(self):
+        """
+        returns: A list with, for every PDA, True if it accepts the input fed
+        so far and False otherwise
+        """
+        return [pda.is_accepting() for pda in self.pdas]
+
+    def snapshot(self):
+        """
+        Save the configurations of all PDAs, see PDA.snapshot()
+        """
+        return [pda.snapshot() for pda in self.pdas], self.active
+
+    def restore(self, snapshot):
+        """
+        Continue from configurations saved with snapshot()
+        """
+        snapshots, self.active = snapshot
+        for pda, pda_snapshot in zip(self.pdas, snapshots):
+            pda.restore(pda_snapshot)
+
+
+def symbol_id(symbol, pda):
+    """
+    What pop() of a stack of interned symbol ids returns with the stack
+    symbol 'symbol' on top: its id, or 'ϵ' for an empty stack
+    """
+    if symbol == "ϵ":
+        return symbol
+    return pda.stack_ids[symbol]
+
+
+def symbol_name(stack, top):
+    """
+    The stack symbol that pop() of a stack of interned symbol ids returned as
+    'top'
+    """
+    if top == "ϵ":
+        return top
+    return stack.names[top]
+
+
+class ListStack:
+    """
+    Stack of a Pushdown Automaton (PDA), stored as a list of stack symbols
+    with the top of the stack last
+    """
+    def __init__(self, symbols, pda):
+        """
+        symbols: The initial stack, bottom first
+        pda:     The PDA the stack belongs to
+        """
+        self.symbols = list(symbols)
+        self.bind()
+
+    def bind(self):
+        """
+        Use the methods of the list itself as pop() (which raises an
+        IndexError if the stack is empty), push_back() and push(), which
+        saves a call per transition
+        """
+        self.pop = self.symbols.pop
+        self.push_back = self.symbols.append
+        self.push = self.symbols.extend
+
+    @staticmethod
+    def compile(new_top_stack, pda):
+        """
+        Precompile the right-hand side 'new_top_stack' of a relation into the
+        list of symbols to push. Unfortunately Kozen notation has the top of
+        the stack on the left, while Python has it on the right --> reverse.
+        """
+        if new_top_stack == "ϵ":
+            return []
+        return list(reversed(new_top_stack))
+
+    @staticmethod
+    def key(symbol, pda):
+        """
+        returns: What pop() returns with the stack symbol 'symbol' on top
+        """
+        return symbol
+
+    def name(self, top):
+        """ returns: The stack symbol popped as 'top' """
+        return top
+
+    def copy(self):
+        """ returns: An independent copy of the stack """
+        stack = copy.copy(self)
+        stack.symbols = self.symbols[:]
+        stack.bind()
+        return stack
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+    def __reversed__(self):
+        return reversed(self.symbols)
+
+
+class CounterStack:
+    """
+    Stack of a Pushdown Automaton (PDA) that consists of a prefix of symbols
+    with any amount of copies of a single counting symbol on top, stored as
+    the prefix and a count, see PDA.find_counter_symbol()
+    """
+    def __init__(self, symbols, pda):
+        """
+        symbols: The initial stack, bottom first
+        pda:     The PDA the stack belongs to
+        """
+        self.counter_symbol = pda.counter_symbol
+        self.prefix = list(symbols)
+        self.count = 0
+        while self.prefix and self.prefix[-1] == self.counter_symbol:
+            self.prefix.pop()
+            self.count += 1
+
+    @staticmethod
+    def compile(new_top_stack, pda):
+        """
+        Precompile the right-hand side 'new_top_stack' of a relation into the
+        symbols to add to the prefix and the amount to add to the count
+        """
+        if new_top_stack == "ϵ":
+            return [], 0
+        count = 0
+        while count < len(new_top_stack) and \
+                new_top_stack[count] == pda.counter_symbol:
+            count += 1
+        return list(reversed(new_top_stack[count:])), count
+
+    @staticmethod
+    def key(symbol, pda):
+        """
+        returns: What pop() returns with the stack symbol 'symbol' on top
+        """
+        return symbol
+
+    def name(self, top):
+        """ returns: The stack symbol popped as 'top' """
+        return top
+
+    def pop(self):
+        """
+        Remove the top of the stack
+        returns: The removed symbol, raises an IndexError if the stack is
+        empty
+        """
+        if self.count:
+            self.count -= 1
+            return self.counter_symbol
+        return self.prefix.pop()
+
+    def push_back(self, symbol):
+        """ Undo pop(), which returned 'symbol' """
+        if symbol == self.counter_symbol:
+            self.count += 1
+        else:
+            self.prefix.append(symbol)
+
+    def push(self, push):
+        """ Push symbols precompiled with compile() """
+        below, count = push
+        if below:
+            self.prefix.extend(below)
+        self.count += count
+
+    def copy(self):
+        """ returns: An independent copy of the stack """
+        stack = copy.copy(self)
+        stack.prefix = self.prefix[:]
+        return stack
+
+    def __len__(self):
+        return len(self.prefix) + self.count
+
+    def __iter__(self):
+        return chain(self.prefix, repeat(self.counter_symbol, self.count))
+
+    def __reversed__(self):
+        return chain(repeat(self.counter_symbol, self.count),
+                     reversed(self.prefix))
+
+
+class ArrayStack:
+    """
+    Stack of a Pushdown Automaton (PDA), stored as an array of interned stack
+    symbol ids with the top of the stack last
+    """
+    def __init__(self, symbols, pda):
+        """
+        symbols: The initial stack, bottom first
+        pda:     The PDA the stack belongs to
+        """
+        self.names = pda.stack_names
+        self.symbols = array(stack_typecode(pda),
+                             [pda.stack_ids[symbol] for symbol in symbols])
+        self.bind()
+
+    def bind(self):
+        """
+        Use the methods of the array itself as pop() (which raises an
+        IndexError if the stack is empty), push_back() and push(), which
+        saves a call per transition
+        """
+        self.pop = self.symbols.pop
+        self.push_back = self.symbols.append
+        self.push = self.symbols.extend
+
+    @staticmethod
+    def compile(new_top_stack, pda):
+        """
+        Precompile the right-hand side 'new_top_stack' of a relation into an
+        array of symbol ids, pushed with a single extend
+        """
+        if new_top_stack == "ϵ":
+            return array(stack_typecode(pda))
+        return array(stack_typecode(pda), [pda.stack_ids[symbol] for symbol
+                                           in reversed(new_top_stack)])
+
+    key = staticmethod(symbol_id)
+    name = symbol_name
+
+    def copy(self):
+        """ returns: An independent copy of the stack """
+        stack = copy.copy(self)
+        stack.symbols = self.symbols[:]
+        stack.bind()
+        return stack
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __iter__(self):
+        return (self.names[idx] for idx in self.symbols)
+
+    def __reversed__(self):
+        return (self.names[idx] for idx in reversed(self.symbols))
+
+
+class RunLengthStack:
+    """
+    Stack of a Pushdown Automaton (PDA), stored as runs of identical interned
+    stack symbol ids: an array of ids and an array of run lengths, with the
+    top of the stack last
+    """
+    def __init__(self, symbols, pda):
+        """
+        symbols: The initial stack, bottom first
+        pda:     The PDA the stack belongs to
+        """
+        self.names = pda.stack_names
+        self.run_ids = array(stack_typecode(pda))
+        self.run_lengths = array('Q')
+        self.size = 0
+        self.push(self.compile(list(reversed(symbols)), pda))
+
+    @staticmethod
+    def compile(new_top_stack, pda):
+        """
+        Precompile the right-hand side 'new_top_stack' of a relation into a
+        list of (symbol id, run length) pairs, bottom first
+        """
+        runs = []
+        if new_top_stack == "ϵ":
+            return runs
+        for symbol in reversed(new_top_stack):
+            idx = pda.stack_ids[symbol]
+            if runs and runs[-1][0] == idx:
+                runs[-1] = (idx, runs[-1][1] + 1)
+            else:
+                runs.append((idx, 1))
+        return runs
+
+    key = staticmethod(symbol_id)
+    name = symbol_name
+
+    def pop(self):
+        """
+        Remove the top of the stack
+        returns: The id of the removed symbol, raises an IndexError if the
+        stack is empty
+        """
+        if not self.size:
+            raise IndexError("pop from empty stack")
+        self.size -= 1
+        idx = self.run_ids[-1]
+        if self.run_lengths[-1] == 1:
+            self.run_ids.pop()
+            self.run_lengths.pop()
+        else:
+            self.run_lengths[-1] -= 1
+        return idx
+
+    def push_back(self, idx):
+        """ Undo pop(), which returned 'idx' """
+        self.push([(idx, 1)])
+
+    def push(self, push):
+        """ Push runs precompiled with compile() """
+        for idx, length in push:
+            if self.run_ids and self.run_ids[-1] == idx:
+                self.run_lengths[-1] += length
+            else:
+                self.run_ids.append(idx)
+                self.run_lengths.append(length)
+            self.size += length
+
+    def copy(self):
+        """ returns: An independent copy of the stack """
+        stack = copy.copy(self)
+        stack.run_ids = self.run_ids[:]
+        stack.run_lengths = self.run_lengths[:]
+        return stack
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return chain.from_iterable(
+            repeat(self.names[idx], length)
+            for idx, length in zip(self.run_ids, self.run_lengths))
+
+    def __reversed__(self):
+        return chain.from_iterable(
+            repeat(self.names[idx], length)
+            for idx, length in zip(reversed(self.run_ids),
+                                   reversed(self.run_lengths)))
+
+
+def stack_typecode(pda):
+    """
+    Choose the smallest array typecode that holds every stack symbol id
+    """
+    if len(pda.stack_names) <= 0xFF:
+        return 'B'
+    if len(pda.stack_names) <= 0xFFFF:
+        return 'H'
+    return 'L'
+
+
+STACK_ENGINES = {"list": ListStack, "array": ArrayStack,
+                 "rle": RunLengthStack, "counter": CounterStack}
 
 
 class State:
@@ -200,3 +991,12 @@ class State:
         for lhs, rhs in relations:
             transition_table[lhs[1:]] = rhs
         self.transition_table = transition_table
+
+        # Filled in by the PDA: the transition table with the next State
+        # object and the precompiled stack push of every relation
+        self.compiled_table = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['compiled_table'] = {}
+        return state
@@ -0,0 +1,314 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from NPDA import NPDA
+from PDA import PDA, PDAGroup, STACK_ENGINES
+import verification as verification
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def make_pda_definition(num_states, seed=0):
+    """
+    Creates the definition of a random PDA with a relation for every state,
+    input symbol and top stack symbol
+    """
+    rng = random.Random(seed)
+    Q = ['q' + str(idx) for idx in range(num_states)]
+    Sigma = ['MLEFT', 'MRIGHT', 'READ', 'WRITE', 'BLANK', 'LEM', 'SYMBOL']
+    Gamma = ['⊢', '>', '⊥']
+    delta = [((state, symbol, top), (rng.choice(Q), rng.choice(
+              ["ϵ", [rng.choice(Gamma)], [rng.choice(Gamma), top]])))
+             for state in Q for symbol in Sigma for top in Gamma]
+    return Q, Sigma, Gamma, delta, Q[0], Q[::2]
+
+
+def bench_startup(count):
+    """
+    Compares creating PDAs with PDA() against loading them with PDA.cached()
+    """
+    definitions = [("random 50 states", make_pda_definition(50)),
+                   ("random 500 states", make_pda_definition(500))]
+
+    print("PDA() vs PDA.cached() (%d creations)" % count)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, definition in definitions:
+            creators = (("PDA()", PDA),
+                        ("PDA.cached()", lambda *args:
+                         PDA.cached(*args, cache_dir=cache_dir)))
+            for label, create in creators:
+                start = time.perf_counter()
+                for _ in range(count):
+                    create(*definition)
+                elapsed = time.perf_counter() - start
+                print("%24s %12s %10.3f ms" % (name, label,
+                                               elapsed / count * 1e3))
+
+
+def load_traces(count):
+    """
+    Creates 'count' tokenized traces by repeating tokenized_traces.txt
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'tokenized_traces.txt')
+    with open(path, encoding='utf-8') as f:
+        traces = [line.split() for line in f]
+    return [traces[idx % len(traces)] for idx in range(count)]
+
+
+def bench_verify(count):
+    """
+    Compares creating a new PDA for every verification against resetting and
+    reusing one PDA per verification function
+    """
+    traces = load_traces(count)
+    movement_pda = verification.create_movement_pda()
+    lem_pda = verification.create_lem_pda()
+
+    print("verify_movement + verify_lem (%d traces)" % count)
+    start = time.perf_counter()
+    for trace in traces:
+        verification.verify_movement(trace) and verification.verify_lem(trace)
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f" % ("new PDA per call", elapsed))
+
+    start = time.perf_counter()
+    for trace in traces:
+        verification.verify_movement(trace, movement_pda) and \
+            verification.verify_lem(trace, lem_pda)
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f" % ("reused PDA", elapsed))
+
+
+def bench_group(count):
+    """
+    Compares running the movement and LEM PDAs one after the other against
+    running them in lockstep with a PDAGroup
+    """
+    traces = load_traces(count)
+    movement_pda = verification.create_movement_pda()
+    lem_pda = verification.create_lem_pda()
+    group = PDAGroup([movement_pda, lem_pda])
+
+    print("separate PDAs vs PDAGroup (%d traces)" % count)
+    start = time.perf_counter()
+    for trace in traces:
+        [verification.verify_movement(trace, movement_pda),
+         verification.verify_lem(trace, lem_pda)]
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f" % ("separate PDAs", elapsed))
+
+    start = time.perf_counter()
+    for trace in traces:
+        group.transition_all(trace)
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f" % ("PDAGroup", elapsed))
+
+
+def bench_deep_stack(depth):
+    """
+    Compares the memory and time of the stack engines on traces that sweep
+    'depth' cells to the right
+    """
+    movement_trace = ['MRIGHT'] * depth + ['MLEFT'] * (depth // 2)
+    lem_trace = ['READ', 'LEM', 'WRITE', 'LEM', 'MRIGHT'] + \
+        ['READ', 'SYMBOL', 'WRITE', 'SYMBOL', 'MRIGHT'] * (depth // 5)
+    runs = [("movement", verification.create_movement_pda, movement_trace,
+             ["counter", "list", "array", "rle"]),
+            ("LEM", verification.create_lem_pda, lem_trace,
+             ["list", "array", "rle"])]
+
+    print("PDA stack engines (depth %d)" % depth)
+    for name, create_pda, trace, engines in runs:
+        for engine in engines:
+            pda = create_pda()
+            pda.stack_type = STACK_ENGINES[engine]
+            pda.compile_relations()
+
+            pda.reset()
+            start = time.perf_counter()
+            pda.transition_all(trace)
+            elapsed = time.perf_counter() - start
+
+            pda.reset()
+            tracemalloc.start()
+            pda.transition_all(trace)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print("%24s %10.3f s %10.1f MB" % (name + " " + engine, elapsed,
+                                               peak / 2 ** 20))
+
+
+def bench_batch_movement(count):
+    """
+    Compares verifying movement with the PDA, one trace at a time, against
+    verifying all traces at once with verify_movement_batch
+    """
+    if verification.np is None:
+        print("verify_movement_batch skipped, NumPy is not installed")
+        return
+
+    traces = load_traces(count)
+    movement_pda = verification.create_movement_pda()
+
+    print("PDA vs verify_movement_batch (%d traces)" % count)
+    start = time.perf_counter()
+    expected = [verification.verify_movement(trace, movement_pda)
+                for trace in traces]
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f" % ("PDA", elapsed))
+
+    start = time.perf_counter()
+    verdicts = verification.verify_movement_batch(traces)
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f" % ("verify_movement_batch", elapsed))
+
+    if verdicts.tolist() != expected:
+        sys.exit("BenchmarkError: verify_movement_batch disagrees with PDA")
+
+
+def bench_bounded(count):
+    """
+    Compares running the movement and LEM PDAs in a PDAGroup against running
+    the FAs expanded from them up to a stack bound
+    """
+    traces = load_traces(count)
+    movement_pda = verification.create_movement_pda()
+    lem_pda = verification.create_lem_pda()
+    group = PDAGroup([movement_pda, lem_pda])
+
+    print("PDAGroup vs bounded FAs (%d traces)" % count)
+    start = time.perf_counter()
+    expected = [group.transition_all(trace) for trace in traces]
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f" % ("PDAGroup", elapsed))
+
+    start = time.perf_counter()
+    movement_pda.compile_bounded(verification.MOVEMENT_STACK_BOUND)
+    lem_pda.compile_bounded(verification.LEM_STACK_BOUND)
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f" % ("compile_bounded", elapsed))
+
+    start = time.perf_counter()
+    verdicts = [[movement_pda.accepts(trace), lem_pda.accepts(trace)]
+                for trace in traces]
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f" % ("bounded FAs", elapsed))
+
+    if verdicts != expected:
+        sys.exit("BenchmarkError: bounded FAs disagree with PDAGroup")
+
+
+def bench_trie(count, length):
+    """
+    Compares verifying traces one by one with a PDAGroup against verifying
+    them with verify_trie, on traces that share a long common prefix
+    """
+    rng = random.Random(0)
+    prefix = ['READ', 'LEM', 'WRITE', 'LEM', 'MRIGHT'] + \
+        ['READ', 'SYMBOL', 'WRITE', 'SYMBOL', 'MRIGHT'] * (length // 5)
+    suffixes = ['MLEFT', 'MRIGHT', 'READ', 'WRITE', 'SYMBOL']
+    traces = [prefix + [rng.choice(suffixes) for _ in range(10)]
+              for _ in range(count)]
+    group = PDAGroup([verification.create_movement_pda(),
+                      verification.create_lem_pda()])
+
+    print("PDAGroup vs verify_trie (%d traces of length %d)" %
+          (count, length))
+    start = time.perf_counter()
+    expected = [group.transition_all(trace) for trace in traces]
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f" % ("PDAGroup", elapsed))
+
+    start = time.perf_counter()
+    verdicts = verification.verify_trie(group, traces)
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f" % ("verify_trie", elapsed))
+
+    if verdicts != expected:
+        sys.exit("BenchmarkError: verify_trie disagrees with PDAGroup")
+
+
+def bench_npda(lengths):
+    """
+    Measures the NPDA on even palindromes, for which it keeps a configuration
+    for every possible middle of the input read so far
+    """
+    Q = ["push", "pop", "accept"]
+    Sigma = ["a", "b"]
+    Gamma = ["a", "b", "⊥"]
+    delta = [(("push", symbol, "ϵ"), ("push", [symbol])) for symbol in Sigma]
+    delta += [(("pop", symbol, symbol), ("pop", "ϵ")) for symbol in Sigma]
+    delta += [(("push", "ϵ", "ϵ"), ("pop", "ϵ")),
+              (("pop", "ϵ", "⊥"), ("accept", "ϵ"))]
+    npda = NPDA(Q, Sigma, Gamma, delta, "push", ["accept"])
+
+    print("NPDA on palindromes")
+    rng = random.Random(0)
+    for length in lengths:
+        half = [rng.choice(Sigma) for _ in range(length // 2)]
+        npda.reset()
+        start = time.perf_counter()
+        accepted = npda.transition_all(half + half[::-1])
+        elapsed = time.perf_counter() - start
+        print("%24s %10.3f %s" % ("length " + str(length), elapsed,
+                                  accepted))
+
+
+def bench_npda_grammar(lengths):
+    """
+    Measures the NPDA of the left-recursive grammar E -> E+a | a, of which
+    the moves that read no input keep pushing. The NPDA bounds them by the
+    length of the input.
+    """
+    Q = ["start", "expand", "accept"]
+    Sigma = ["a", "+"]
+    Gamma = ["E", "a", "+", "⊥"]
+    delta = [(("start", "ϵ", "⊥"), ("expand", ["E", "⊥"])),
+             (("expand", "ϵ", "E"), ("expand", ["E", "+", "a"])),
+             (("expand", "ϵ", "E"), ("expand", ["a"])),
+             (("expand", "a", "a"), ("expand", "ϵ")),
+             (("expand", "+", "+"), ("expand", "ϵ")),
+             (("expand", "ϵ", "⊥"), ("accept", "ϵ"))]
+    npda = NPDA(Q, Sigma, Gamma, delta, "start", ["accept"])
+
+    print("NPDA on a left-recursive grammar")
+    for length in lengths:
+        npda.reset()
+        start = time.perf_counter()
+        accepted = npda.transition_all(["a"] + ["+", "a"] * (length // 2))
+        elapsed = time.perf_counter() - start
+        print("%24s %10.3f %s" % ("length " + str(length + 1), elapsed,
+                                  accepted))
+
+
+def main(count):
+    """
+    Runs all benchmarks
+    """
+    bench_startup(count)
+    bench_verify(100000)
+    bench_group(100000)
+    bench_batch_movement(100000)
+    bench_bounded(100000)
+    bench_trie(2000, 1000)
+    bench_npda([1000, 2000, 4000])
+    bench_npda_grammar([100, 200, 400])
+    bench_deep_stack(10 ** 6)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main(20)
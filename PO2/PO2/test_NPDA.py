@@ -0,0 +1,97 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from NPDA import NPDA
+import unittest
+import verification as verification
+
+
+class TestPushOnly(unittest.TestCase):
+    """
+    Moves that read no input and only push, which the ε-closure has to bound
+    """
+
+    def test_free_symbol(self):
+        """
+        The pushed symbol costs no input to remove, so the stack never costs
+        more than the remaining input
+        """
+        Q = ['p', 'q']
+        Sigma = ['x']
+        Gamma = ['A', '⊥']
+        delta = [(('p', 'ϵ', 'ϵ'), ('p', ['A'])),
+                 (('p', 'ϵ', 'A'), ('p', 'ϵ')),
+                 (('p', 'x', '⊥'), ('q', 'ϵ'))]
+        for max_configurations in (100, 10000):
+            npda = NPDA(Q, Sigma, Gamma, delta, 'p', ['q'],
+                        max_configurations=max_configurations)
+            self.assertIs(npda.transition_all(['x']), True)
+            npda.reset()
+            self.assertIs(npda.transition_all(['x', 'x']), False)
+            npda.reset()
+            self.assertIs(npda.transition_all([]), False)
+
+    def test_left_recursion(self):
+        """
+        Grammar E -> E+a | a, of which the ε-move E -> E+a only pushes
+        """
+        Q = ['s', 'q', 'f']
+        Sigma = ['a', '+']
+        Gamma = ['E', 'a', '+', '⊥']
+        delta = [(('s', 'ϵ', '⊥'), ('q', ['E', '⊥'])),
+                 (('q', 'ϵ', 'E'), ('q', ['E', '+', 'a'])),
+                 (('q', 'ϵ', 'E'), ('q', ['a'])),
+                 (('q', 'a', 'a'), ('q', 'ϵ')),
+                 (('q', '+', '+'), ('q', 'ϵ')),
+                 (('q', 'ϵ', '⊥'), ('f', 'ϵ'))]
+        for pda_type in ("final_state", "empty_stack"):
+            npda = NPDA(Q, Sigma, Gamma, delta, 's', ['f'], pda_type,
+                        max_configurations=1000)
+            for trace, accepted in (('a', True), ('a+a+a', True),
+                                    ('a' + '+a' * 50, True), ('', False),
+                                    ('a+', False), ('+a', False)):
+                npda.reset()
+                self.assertIs(npda.transition_all(list(trace)), accepted)
+
+
+class TestTrie(unittest.TestCase):
+    """
+    verify_trie on an NPDA, which has to know the remaining input before its
+    first closure
+    """
+
+    def test_push_only_loop(self):
+        """
+        a^n b^n, with a move that reads no input and pushes M, which an 'a'
+        can remove
+        """
+        Q = ['p', 'q', 'f']
+        Sigma = ['a', 'b']
+        Gamma = ['A', 'M', '⊥']
+        delta = [(('p', 'a', 'ϵ'), ('p', ['A'])),
+                 (('p', 'ϵ', 'ϵ'), ('p', ['M'])),
+                 (('p', 'a', 'M'), ('p', 'ϵ')),
+                 (('p', 'ϵ', 'ϵ'), ('q', 'ϵ')),
+                 (('q', 'b', 'A'), ('q', 'ϵ')),
+                 (('q', 'ϵ', '⊥'), ('f', 'ϵ'))]
+        npda = NPDA(Q, Sigma, Gamma, delta, 'p', ['f'],
+                    max_configurations=5000)
+        traces = [list(trace) for trace in
+                  ('ab', 'aabb', 'abb', '', 'aab', 'abab', 'aaabbb')]
+
+        expected = []
+        for trace in traces:
+            npda.reset()
+            expected.append(npda.transition_all(trace))
+        self.assertEqual(expected[:3], [True, True, False])
+        self.assertEqual(verification.verify_trie(npda, traces), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
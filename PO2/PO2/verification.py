@@ -7,16 +7,26 @@
 #   license.                                          #
 # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
-from PDA import PDA
+from PDA import PDA, PDAGroup
 import sys
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-def verify_movement(trace):
+# Head movement of the movement tokens, all other tokens do not move
+MOVES = {'MRIGHT': 1, 'MLEFT': -1}
+
+# Stack heights up to which the PDAs are expanded into FAs with --bounded,
+# deeper traces are verified on the PDAs themselves, see PDA.accepts()
+MOVEMENT_STACK_BOUND = 64
+LEM_STACK_BOUND = 8
+
+
+def create_movement_pda():
     """
-    Creates and uses a PDA to verify proper Turing machine (TM) movement in a
-    single execution trace
-    trace: A list of events (tokens)
-    returns: True if the trace behaviour is valid, False otherwise
+    Creates the PDA to verify proper Turing machine (TM) movement
     """
 
     # Characters for initial stack symbol and epsilon: ⊥ , ϵ
@@ -45,15 +55,12 @@ def verify_movement(trace):
 
     # Note: you can use my_pda.transition(symbol) to test a single transition.
 
-    return my_pda.transition_all(trace)
+    return my_pda
 
 
-def verify_lem(trace):
+def create_lem_pda():
     """
-    Creates and uses a PDA to verify Turing machine (TM) left endmarker for a
-    single execution trace
-    trace: A list of events (tokens)
-    returns: True if the trace behaviour is valid, False otherwise
+    Creates the PDA to verify the Turing machine (TM) left endmarker
     """
 
     # Characters for initial stack symbol and epsilon: ⊥ , ϵ
@@ -122,30 +129,263 @@ def verify_lem(trace):
 
     # Note: you can use my_pda.transition(symbol) to test a single transition.
 
-    return my_pda.transition_all(trace)
+    return my_pda
+
+
+def verify_movement(trace, pda=None):
+    """
+    Uses a PDA to verify proper Turing machine (TM) movement in a single
+    execution trace
+    trace: A list of events (tokens)
+    pda:   Optional PDA created by create_movement_pda(), which is reset and
+           reused instead of creating a new one
+    returns: True if the trace behaviour is valid, False otherwise
+    """
+    if pda is None:
+        pda = create_movement_pda()
+    pda.reset()
+    return pda.transition_all(trace)
+
 
+def verify_movement_batch(traces):
+    """
+    Verifies proper Turing machine (TM) movement for many execution traces at
+    once with NumPy, giving the same verdicts as verify_movement
+    traces: A list of traces, each a list of events (tokens)
+    returns: A NumPy array with True for every valid trace, False otherwise
+    """
+    if np is None:
+        sys.exit("ImportError: verify_movement_batch requires NumPy")
+
+    # Explanation:
+    # The movement PDA counts right moves with the stack. Its first move has
+    # to be to the right. After that a left move at count 0 fails, while a
+    # right move at count 0 finds no relation and is skipped, so once the
+    # count returns to 0 no left move may follow. With the moves as +1/-1 in
+    # a padded matrix, the count is the cumulative sum of every row until it
+    # first returns to 0.
+
+    lengths = np.array([len(trace) for trace in traces], dtype=np.int64)
+    width = int(lengths.max()) if len(traces) else 0
+    if width == 0:
+        return np.zeros(len(traces), dtype=bool)
+
+    flat = np.array([MOVES.get(token, 0) for trace in traces
+                     for token in trace], dtype=np.int8)
+    moves = np.zeros((len(traces), width), dtype=np.int8)
+    rows = np.repeat(np.arange(len(traces)), lengths)
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    moves[rows, np.arange(len(flat)) - offsets] = flat
+
+    rows = np.arange(len(traces))
+    moved = np.cumsum(moves != 0, axis=1) > 0
+    starts_right = moves[rows, np.argmax(moves != 0, axis=1)] == 1
 
-def main(path):
+    returned = moved & (np.cumsum(moves, axis=1, dtype=np.int32) <= 0)
+    first_return = np.argmax(returned, axis=1)
+    lefts = np.cumsum(moves == -1, axis=1, dtype=np.int32)
+    lefts_after_return = lefts[:, -1] - lefts[rows, first_return]
+
+    return starts_right & (~returned.any(axis=1) | (lefts_after_return == 0))
+
+
+def verify_lem(trace, pda=None):
+    """
+    Uses a PDA to verify Turing machine (TM) left endmarker for a single
+    execution trace
+    trace: A list of events (tokens)
+    pda:   Optional PDA created by create_lem_pda(), which is reset and reused
+           instead of creating a new one
+    returns: True if the trace behaviour is valid, False otherwise
+    """
+    if pda is None:
+        pda = create_lem_pda()
+    pda.reset()
+    return pda.transition_all(trace)
+
+
+def read_trace_chunks(f, chunk_size=1 << 16):
+    """
+    Reads the tokenized traces in the file object 'f' in pieces of about
+    'chunk_size' characters, so memory use does not depend on the length of a
+    trace
+    returns: A generator of (tokens, end) tuples, where 'tokens' is a list of
+    the next tokens of the current trace and 'end' is True for the last chunk
+    of every trace
+    """
+    partial = ''
+    pending = False
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            break
+
+        lines = (partial + data).split('\n')
+        partial = lines.pop()
+        for line in lines:
+            yield line.split(), True
+        pending = bool(partial) or (pending and not lines)
+
+        # Hold back the last token, it may continue in the next piece
+        tokens = partial.split()
+        partial = ''
+        if tokens and not data[-1].isspace():
+            partial = tokens.pop()
+        if tokens:
+            yield tokens, False
+
+    if pending:
+        yield partial.split(), True
+
+
+def verify_stream(path, chunk_size=1 << 16):
+    """
+    Verifies the tokenized traces in the file at 'path' with the movement and
+    LEM PDAs, without ever holding a complete trace in memory
+    returns: A generator of [movement, LEM] verdicts, one for every trace
+    """
+    verifier = PDAGroup([create_movement_pda(), create_lem_pda()])
+    with open(path, encoding='utf-8') as f:
+        for tokens, end in read_trace_chunks(f, chunk_size):
+            verifier.feed(tokens)
+            if end:
+                yield verifier.result()
+                verifier.reset()
+
+
+def verify_trie(verifier, traces):
+    """
+    Verifies many traces by walking a trie of them, so every prefix that
+    traces share is fed to the verifier only once. The configuration of the
+    verifier is saved at every branch of the trie and restored for each of
+    its children.
+    verifier: A PDA, PDAGroup or NPDA
+    traces:   A list of traces, each a list of events (tokens)
+    returns:  A list with the result() of the verifier for every trace
+    """
+    # Every node of the trie is a list of a dictionary of children, by token,
+    # a list of the indices of the traces that end in it and the length of
+    # the longest trace below it, from the node on. That is the most input
+    # that can follow, which an NPDA uses to bound its configurations.
+    root = [{}, [], 0]
+    for idx, trace in enumerate(traces):
+        node = root
+        for position, token in enumerate(trace):
+            node[2] = max(node[2], len(trace) - position)
+            node = node[0].setdefault(token, [{}, [], 0])
+        node[1].append(idx)
+
+    results = [None] * len(traces)
+    verifier.reset()
+    todo = [(verifier.snapshot(), None, root)]
+    while todo:
+        snapshot, token, node = todo.pop()
+        verifier.restore(snapshot)
+        if token is None:
+            running = verifier.feed((), remaining=node[2])
+        else:
+            running = verifier.feed((token,), remaining=node[2] + 1)
+
+        # Follow the trie without saving the configuration up to a branch
+        while running:
+            children, ends, _ = node
+            if ends:
+                result = verifier.result()
+                for idx in ends:
+                    results[idx] = result
+            if len(children) != 1:
+                break
+            (token, node), = children.items()
+            running = verifier.feed((token,), remaining=node[2] + 1)
+
+        if running:
+            if children:
+                snapshot = verifier.snapshot()
+                todo.extend((snapshot, token, child)
+                            for token, child in children.items())
+            continue
+
+        # The outcome is certain for all traces below the node
+        result = verifier.result()
+        below = [node]
+        while below:
+            children, ends, _ = below.pop()
+            for idx in ends:
+                results[idx] = result
+            below.extend(children.values())
+
+    return results
+
+
+def main(path, batch=False, stream=False, bounded=False, trie=False):
     """
     Reads multiple tokenized traces from the file at 'path' and feeds them to
     the various verification functions.
+    batch:   Verify the movement of all traces at once with
+             verify_movement_batch instead of with the PDA
+    bounded: Verify the traces on FAs expanded from the PDAs up to a stack
+             bound, see PDA.compile_bounded()
+    trie:    Verify the traces with verify_trie, feeding shared prefixes
+             only once
+    stream:  Verify the traces while reading them with verify_stream, for
+             traces too large to hold in memory. Traces are then printed by
+             number instead of by content.
     """
+    if stream:
+        valid = []
+        for number, (movement, lem) in enumerate(verify_stream(path), 1):
+            print("Trace          : " + str(number))
+            print("Verify movement: " + str(movement))
+            if movement:
+                print("Verify LEM     : " + str(lem))
+            if movement and lem:
+                valid.append(number)
+
+        print("Remaining trace(s):")
+        for number in valid:
+            print(number)
+        return
+
     # Read and parse traces.
     fo = open(path, encoding='utf-8')
     with fo as f:
         traces = [trace.split() for trace in [line.rstrip('\n') for line in f]]
     fo.close()
 
-    # Verify traces using verification functions
-    valid = traces
-    for trace in valid:
+    # Verify traces using all verification functions in a single pass over
+    # every trace
+    if batch:
+        lem_pda = create_lem_pda()
+        verdicts = [(bool(movement), movement and verify_lem(trace, lem_pda))
+                    for trace, movement in
+                    zip(traces, verify_movement_batch(traces))]
+    elif bounded:
+        movement_pda = create_movement_pda()
+        lem_pda = create_lem_pda()
+        movement_pda.compile_bounded(MOVEMENT_STACK_BOUND)
+        lem_pda.compile_bounded(LEM_STACK_BOUND)
+        verdicts = [(movement_pda.accepts(trace), lem_pda.accepts(trace))
+                    for trace in traces]
+    elif trie:
+        verifier = PDAGroup([create_movement_pda(), create_lem_pda()])
+        verdicts = verify_trie(verifier, traces)
+    else:
+        # Two reused PDAs run one after the other are a little faster than a
+        # PDAGroup, which is meant for input that is read only once
+        movement_pda = create_movement_pda()
+        lem_pda = create_lem_pda()
+        verdicts = [(verify_movement(trace, movement_pda),
+                     verify_lem(trace, lem_pda)) for trace in traces]
+
+    valid = list(zip(traces, verdicts))
+    for trace, (movement, _) in valid:
         print("Trace          : \"" + str(trace) + "\"")
-        print("Verify movement: " + str(verify_movement(trace)))
-    valid = [trace for trace in valid if verify_movement(trace)]
-    for trace in valid:
+        print("Verify movement: " + str(movement))
+    valid = [(trace, verdict) for trace, verdict in valid if verdict[0]]
+    for trace, (_, lem) in valid:
         print("Trace          : \"" + str(trace) + "\"")
-        print("Verify LEM     : " + str(verify_lem(trace)))
-    valid = [trace for trace in valid if verify_lem(trace)]
+        print("Verify LEM     : " + str(lem))
+    valid = [trace for trace, verdict in valid if verdict[1]]
 
     # Print the remaining valid trace(s)
     print("Remaining trace(s):")
@@ -156,6 +396,9 @@ def main(path):
 if __name__ == '__main__':
     if len(sys.argv) < 2:
         sys.exit('RuntimeError: Use `python3 verification.py \
-                 tokenized_traces.txt`')
+                 tokenized_traces.txt [--batch | --stream | --bounded | \
+                 --trie]`')
     source = sys.argv[1]
-    main(source)
+    main(source, batch='--batch' in sys.argv[2:],
+         stream='--stream' in sys.argv[2:],
+         bounded='--bounded' in sys.argv[2:], trie='--trie' in sys.argv[2:])
@@ -7,8 +7,28 @@
 #   license.                                          #
 # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
+from array import array
+from itertools import chain
+import hashlib
+import os
 import sys
 
+# On-disk cache of validated and compiled automata, see TM.cached()
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         '__pycache__', 'automata')
+
+# The automaton cache of PO1, used by TM.cached()
+PO1_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       os.pardir, 'PO1')
+
+# The tape is stored in segments of 2 ** SEGMENT_BITS cells, see Tape
+SEGMENT_BITS = 16
+SEGMENT_SIZE = 1 << SEGMENT_BITS
+SEGMENT_MASK = SEGMENT_SIZE - 1
+
+# Compiled simulators by definition hash, see TM.compile_simulator()
+SIMULATORS = {}
+
 
 class TM:
     """
@@ -94,15 +114,15 @@ class TM:
         if not set(Sigma).issubset(Gamma):
             sys.exit("TM-Error: Gamma does not contain all elements of Sigma")
 
+        # Group the transitions by state in a single pass over delta
+        transitions = {new_state_name: [] for new_state_name in Q}
+        for transition in delta:
+            transitions[transition[0][0]].append(transition)
+
         # Create states
         self.states = {}
         for new_state_name in Q:
-            # Check if the state-to-be has any transitions
-            new_state_transitions = []
-            for transition in delta:
-                if transition[0][0] == new_state_name:
-                    new_state_transitions.append(transition)
-            new_state = State(new_state_name, new_state_transitions)
+            new_state = State(new_state_name, transitions[new_state_name])
             self.states[new_state_name] = new_state
 
         # Retain and assign variables
@@ -114,7 +134,11 @@ class TM:
         self.accept_state = self.states[t]
         self.reject_state = self.states[r]
 
+        self.compile()
+
         # Setup the tape and the rest of the TM
+        self.record_trace = True
+        self.trace_stream = None
         self.tape = Tape("")  # init with empty tape
         self.current_state = self.start_state
         self.step_counter = 0
@@ -123,11 +147,281 @@ class TM:
         if verbose:
             print("TM initialization complete, waiting for input...")
 
+    @classmethod
+    def cached(cls, Q, Sigma, Gamma, delta, s, t, r, verbose=False,
+               no_halt=1000, cache_dir=CACHE_DIR):
+        """
+        Creates the TM object like TM(), but loads it from the on-disk cache
+        without validating it again if the same definition was created before
+        cache_dir: The directory of the cache
+        """
+        if PO1_DIR not in sys.path:
+            sys.path.append(PO1_DIR)
+        from cache import cache_path, load_cached, store_cached
+
+        definition = (Q, Sigma, Gamma, delta, s, t, r, verbose, no_halt)
+        path = cache_path(cls, definition, cache_dir)
+        tm = load_cached(path)
+        if tm is None:
+            tm = cls(*definition)
+            store_cached(path, tm)
+        elif verbose:
+            print("TM initialization complete, waiting for input...")
+        return tm
+
+    def compile(self):
+        """
+        Intern states and tape symbols as small integers and build the dense
+        transition table used by transition_all(). Tape symbols are numbered
+        like on the Tape: the blank first, then Gamma in order. The table
+        holds, for every state and tape symbol, a tuple of the row of the
+        next state, the id of the symbol to write and the movement of the
+        head (1 or -1), or None if there is no transition or the state halts.
+        The sweeps list holds, for every entry of the table that rewrites the
+        symbol it reads and stays in the same state, the ids of the symbols
+        at which a sweep of the head in its direction stops, see scan_cells().
+        """
+        self.state_list = list(self.states.values())
+        state_ids = {state.name: idx for idx, state in
+                     enumerate(self.state_list)}
+        self.tape_symbols = ['⊔'] + [symbol for symbol in self.tape_alphabet
+                                     if symbol != '⊔']
+        self.symbol_ids = {symbol: idx for idx, symbol in
+                           enumerate(self.tape_symbols)}
+
+        num_symbols = len(self.tape_symbols)
+        self.table = [None] * (len(self.state_list) * num_symbols)
+        for state in self.state_list:
+            if state in (self.accept_state, self.reject_state):
+                continue
+            base = state_ids[state.name] * num_symbols
+            for symbol, (new_state_name, new_tape_element, movement) in \
+                    state.transition_table.items():
+                self.table[base + self.symbol_ids[symbol]] = \
+                    (state_ids[new_state_name] * num_symbols,
+                     self.symbol_ids[new_tape_element],
+                     1 if movement == 'R' else -1)
+
+        # Sweeps scan the cells as bytes, so not on tapes with more than 256
+        # tape symbols
+        self.sweeps = [None] * len(self.table)
+        if num_symbols <= 0x100:
+            for base in range(0, len(self.table), num_symbols):
+                loops = {1: set(), -1: set()}
+                for symbol in range(num_symbols):
+                    entry = self.table[base + symbol]
+                    if entry is not None and entry[:2] == (base, symbol):
+                        loops[entry[2]].add(symbol)
+                for symbols in loops.values():
+                    stops = tuple(symbol for symbol in range(num_symbols)
+                                  if symbol not in symbols)
+                    for symbol in symbols:
+                        self.sweeps[base + symbol] = stops
+
+        # The generated simulator only depends on the table, see
+        # compile_simulator()
+        definition = (self.tape_symbols, self.table, SEGMENT_BITS)
+        self.simulator_key = hashlib.sha256(
+            repr(definition).encode('utf-8')).hexdigest()
+        self.specialized = False
+
+    def simulator_source(self):
+        """
+        Generate Python source of a simulator specialized to the transitions
+        of the TM, which takes the same steps as run(). Every state is a
+        block that compares the symbol under the head with the literal ids of
+        the symbols it has transitions for, and that keeps looping over its
+        transitions to itself. Sweeps are taken at once, like in run().
+        returns: The source, which defines the functions simulate and
+        simulate_traced, the latter recording the execution trace
+        """
+        num_symbols = len(self.tape_symbols)
+        endmarker = self.symbol_ids['⊢']
+        lines = []
+
+        def emit(indent, line):
+            lines.append('    ' * indent + line)
+
+        for traced in (False, True):
+            emit(0, "def simulate" + ("_traced" if traced else "") +
+                 "(tm, tape, trace, step_records, state):")
+            emit(1, "segments = tape.segments")
+            emit(1, "new_segment = tape.new_segment")
+            emit(1, "index = tape.index")
+            emit(1, "length = tape.length")
+            emit(1, "number = index >> %d" % SEGMENT_BITS)
+            emit(1, "offset = index & %d" % SEGMENT_MASK)
+            emit(1, "segment = segments.get(number)")
+            emit(1, "step_counter = tm.step_counter")
+            emit(1, "max_steps = tm.max_steps")
+            if traced:
+                emit(1, "records = trace.records")
+                emit(1, "flush = trace.stream is not None")
+                emit(1, "chunk_size = trace.chunk_size")
+            emit(1, "running = True")
+            emit(1, "while running:")
+
+            keyword = "if"
+            for state_id, state in enumerate(self.state_list):
+                base = state_id * num_symbols
+                entries = [(symbol, self.table[base + symbol])
+                           for symbol in range(num_symbols)
+                           if self.table[base + symbol] is not None]
+                if not entries:
+                    continue
+
+                emit(2, "%s state == %d:  # %r" % (keyword, state_id,
+                                                  state.name))
+                keyword = "elif"
+                emit(3, "while True:")
+                emit(4, "if step_counter > max_steps:")
+                emit(5, "running = False")
+                emit(5, "break")
+                emit(4, "symbol = segment[offset] if segment is not None "
+                     "else 0")
+
+                for idx, (symbol, entry) in enumerate(entries):
+                    next_base, new_symbol, movement = entry
+                    emit(4, "%s symbol == %d:" % ("elif" if idx else "if",
+                                                 symbol))
+                    if new_symbol != endmarker or movement < 0:
+                        emit(5, "if not index:")
+                        emit(6, "running = False")
+                        emit(6, "break")
+                    stops = self.sweeps[base + symbol]
+                    if stops is not None:
+                        self.emit_sweep(emit, traced, base, movement, stops)
+                        continue
+
+                    if traced:
+                        emit(5, "records.extend(step_records[%d])" %
+                             (base + symbol))
+                        emit(5, "if flush and len(records) >= chunk_size:")
+                        emit(6, "trace.flush()")
+
+                    # Writing the symbol that was read changes nothing
+                    if new_symbol != symbol:
+                        emit(5, "if segment is not None:")
+                        emit(6, "segment[offset] = %d" % new_symbol)
+                        if new_symbol:
+                            emit(5, "else:")
+                            emit(6, "segment = segments[number] = "
+                                 "new_segment()")
+                            emit(6, "segment[offset] = %d" % new_symbol)
+
+                    if movement > 0:
+                        emit(5, "index += 1")
+                        emit(5, "if index == length:")
+                        emit(6, "length += 1")
+                        emit(5, "offset += 1")
+                        emit(5, "if offset == %d:" % SEGMENT_SIZE)
+                        emit(6, "number += 1")
+                        emit(6, "offset = 0")
+                        emit(6, "segment = segments.get(number)")
+                    else:
+                        emit(5, "index -= 1")
+                        emit(5, "offset -= 1")
+                        emit(5, "if offset < 0:")
+                        emit(6, "number -= 1")
+                        emit(6, "offset = %d" % SEGMENT_MASK)
+                        emit(6, "segment = segments.get(number)")
+                    emit(5, "step_counter += 1")
+
+                    if next_base != base:
+                        emit(5, "state = %d" % (next_base // num_symbols))
+                        emit(5, "break")
+
+                emit(4, "else:")
+                emit(5, "running = False")
+                emit(5, "break")
+
+            # Halting states and states without transitions
+            if keyword == "if":
+                emit(2, "break")
+            else:
+                emit(2, "else:")
+                emit(3, "break")
+
+            emit(1, "tape.index = index")
+            emit(1, "tape.length = length")
+            emit(1, "tm.current_state = tm.state_list[state]")
+            emit(1, "tm.step_counter = step_counter")
+            emit(0, "")
+
+        return "\n".join(lines)
+
+    def emit_sweep(self, emit, traced, base, movement, stops):
+        """
+        Generate the source of a sweep for simulator_source(), which takes all
+        steps of the entry of the table at row 'base' that loops in the same
+        state, like run() does
+        """
+        num_symbols = len(self.tape_symbols)
+        budget = "max_steps - step_counter + 1"
+        if movement < 0:
+            budget = "min(" + budget + ", index)"
+        emit(5, "count = scan_cells(segment, offset, %d, %r, %s)" %
+             (movement, stops, budget))
+        if traced:
+            emit(5, "records.extend(sweep_records(step_records[%d:%d], "
+                 "segment, offset, %d, count))" %
+                 (base, base + num_symbols, movement))
+            emit(5, "if flush and len(records) >= chunk_size:")
+            emit(6, "trace.flush()")
+
+        if movement > 0:
+            emit(5, "index += count")
+            emit(5, "if index >= length:")
+            emit(6, "length = index + 1")
+            emit(5, "offset += count")
+            emit(5, "if offset == %d:" % SEGMENT_SIZE)
+            emit(6, "number += 1")
+            emit(6, "offset = 0")
+            emit(6, "segment = segments.get(number)")
+        else:
+            emit(5, "index -= count")
+            emit(5, "offset -= count")
+            emit(5, "if offset < 0:")
+            emit(6, "number -= 1")
+            emit(6, "offset = %d" % SEGMENT_MASK)
+            emit(6, "segment = segments.get(number)")
+        emit(5, "step_counter += count")
+
+    def compile_simulator(self):
+        """
+        Compile the source of simulator_source() and run transition_all() on
+        it from now on. The simulator is compiled once for every definition
+        and shared by all TMs with the same transitions.
+        """
+        if self.simulator_key not in SIMULATORS:
+            namespace = {'scan_cells': scan_cells,
+                         'sweep_records': sweep_records}
+            exec(compile(self.simulator_source(),
+                         "<TM simulator " + self.simulator_key[:12] + ">",
+                         "exec"), namespace)
+            SIMULATORS[self.simulator_key] = (namespace['simulate'],
+                                              namespace['simulate_traced'])
+        self.specialized = True
+
+    def set_trace(self, record=True, stream=None):
+        """
+        Choose how the execution trace is recorded, from the next input on
+        record: Whether to record the execution trace at all. Without it,
+                runs of which only the result is needed are faster.
+        stream: Optional text file object to which the execution trace is
+                written while the TM runs, instead of kept in memory, see
+                ExecutionTrace
+        """
+        self.record_trace = record
+        self.trace_stream = stream
+
     def reset(self):
         """
         Reset the TM
         """
-        self.tape = Tape(self.input_string)
+        trace = ExecutionTrace(self.trace_stream) if self.record_trace \
+            else None
+        self.tape = Tape(self.input_string, trace, self.tape_symbols)
         self.current_state = self.start_state
         self.step_counter = 0
 
@@ -223,12 +517,139 @@ class TM:
         return self.current_state == self.accept_state or self.current_state \
                                   == self.reject_state
 
+    def run(self):
+        """
+        Take TM steps on the dense transition table, or on the simulator of
+        compile_simulator(), without the checks and output of transition().
+        Stops before any step that transition() has to take itself: when the
+        TM halts or stalls, when it would overwrite the left endmarker or move
+        off the tape, or at the step limit.
+        A state that loops on the symbols it reads, rewriting them, sweeps the
+        head over all of them in one go: the cells are scanned as bytes with
+        scan_cells() and the steps are counted and recorded in bulk.
+        """
+        tape = self.tape
+        if self.input_string is None or tape.names != self.tape_symbols:
+            return
+
+        num_symbols = len(self.tape_symbols)
+        table = self.table
+        sweeps = self.sweeps
+        max_steps = self.max_steps
+        endmarker = self.symbol_ids['⊢']
+        state_ids = {state: idx for idx, state in enumerate(self.state_list)}
+
+        # The execution trace records of every entry of the table
+        trace = tape.trace
+        records = None
+        step_records = None
+        if trace is not None:
+            codes = []
+            for symbol in self.tape_symbols:
+                code = trace.codes.get(symbol)
+                codes.append(trace.intern(symbol) if code is None else code)
+            step_records = [None if entry is None else
+                            (codes[idx % num_symbols],
+                             codes[entry[1]] + trace.WRITE,
+                             trace.RIGHT if entry[2] > 0 else trace.LEFT)
+                            for idx, entry in enumerate(table)]
+            records = trace.records
+            flush = trace.stream is not None
+            chunk_size = trace.chunk_size
+
+        if self.specialized:
+            if self.simulator_key not in SIMULATORS:
+                self.compile_simulator()
+            simulate, simulate_traced = SIMULATORS[self.simulator_key]
+            if trace is None:
+                simulate(self, tape, trace, step_records,
+                         state_ids[self.current_state])
+            else:
+                simulate_traced(self, tape, trace, step_records,
+                                state_ids[self.current_state])
+            return
+
+        segments = tape.segments
+        index = tape.index
+        length = tape.length
+        number = index >> SEGMENT_BITS
+        offset = index & SEGMENT_MASK
+        segment = segments.get(number)
+        base = state_ids[self.current_state] * num_symbols
+        step_counter = self.step_counter
+
+        while step_counter <= max_steps:
+            idx = base + (segment[offset] if segment is not None else 0)
+            entry = table[idx]
+            if entry is None:
+                break
+            next_base, symbol, movement = entry
+            if not index and (symbol != endmarker or movement < 0):
+                break
+
+            # Take all steps of a sweep over the cells the state loops on
+            stops = sweeps[idx]
+            if stops is not None:
+                count = scan_cells(segment, offset, movement, stops,
+                                   max_steps - step_counter + 1 if
+                                   movement > 0 else
+                                   min(max_steps - step_counter + 1, index))
+                if records is not None:
+                    records.extend(sweep_records(
+                        step_records[base:base + num_symbols], segment,
+                        offset, movement, count))
+                    if flush and len(records) >= chunk_size:
+                        trace.flush()
+
+                index += movement * count
+                if index >= length:
+                    length = index + 1
+                offset += movement * count
+                if offset < 0 or offset == SEGMENT_SIZE:
+                    number += movement
+                    offset &= SEGMENT_MASK
+                    segment = segments.get(number)
+                step_counter += count
+                continue
+
+            if records is not None:
+                records.extend(step_records[idx])
+                if flush and len(records) >= chunk_size:
+                    trace.flush()
+
+            if segment is not None:
+                segment[offset] = symbol
+            elif symbol:
+                segment = segments[number] = tape.new_segment()
+                segment[offset] = symbol
+
+            index += movement
+            if index == length:
+                length += 1
+            offset += movement
+            if offset < 0 or offset == SEGMENT_SIZE:
+                number += movement
+                offset &= SEGMENT_MASK
+                segment = segments.get(number)
+
+            base = next_base
+            step_counter += 1
+
+        tape.index = index
+        tape.length = length
+        self.current_state = self.state_list[base // num_symbols]
+        self.step_counter = step_counter
+
     def transition_all(self):
         """
         Take TM steps until the input is accepted or rejected.
         returns: True if the input is accepted, False if rejected.
         """
 
+        # Take the ordinary steps on the dense table, and the rest, with all
+        # checks and output, with transition()
+        if not self.verbose:
+            self.run()
         while self.transition():
             pass
 
@@ -250,10 +671,12 @@ class TM:
     def get_execution_trace(self):
         """
         Retrieve a string representing the execution trace of the steps that
-        the TM has taken so far
+        the TM has taken so far. It is empty if the trace is not recorded or
+        streamed, see set_trace().
         """
-        # Omit the final space
-        return self.tape.execution_trace[:-1]
+        if self.tape.trace is None:
+            return ""
+        return self.tape.trace.text()
 
     @staticmethod
     def visualize(trace_input, trace):
@@ -294,6 +717,60 @@ class TM:
         print("Reached the end of the execution trace")
 
 
+def scan_cells(segment, offset, movement, stops, limit):
+    """
+    Count the cells of a tape segment that the head sweeps over, from the
+    cell at 'offset' in the direction of 'movement' (1 or -1), up to the
+    first cell holding one of the symbol ids 'stops'. The cells are searched
+    as bytes, in growing windows so that short sweeps stay cheap.
+    segment: The segment, a bytearray, or None if it is blank
+    limit:   The maximum count, the sweep also stops at the segment end
+    returns: The count
+    """
+    if movement > 0:
+        limit = int(min(limit, SEGMENT_SIZE - offset))
+    else:
+        limit = int(min(limit, offset + 1))
+    if segment is None:
+        return 0 if 0 in stops else limit
+
+    window = 16
+    while True:
+        window = min(window, limit)
+        if movement > 0:
+            end = offset + window
+            for stop in stops:
+                found = segment.find(stop, offset, end)
+                if found >= 0:
+                    end = found
+            count = end - offset
+        else:
+            start = offset + 1 - window
+            for stop in stops:
+                found = segment.rfind(stop, start, offset + 1)
+                if found >= 0:
+                    start = found + 1
+            count = offset + 1 - start
+        if count < window or window == limit:
+            return count
+        window *= 8
+
+
+def sweep_records(row, segment, offset, movement, count):
+    """
+    Determine the execution trace records of a sweep found by scan_cells()
+    row:     The records of the steps of the swept state, by tape symbol id
+    returns: An iterable of the records
+    """
+    if segment is None:
+        return row[0] * count
+    if movement > 0:
+        cells = segment[offset:offset + count]
+    else:
+        cells = segment[offset - count + 1:offset + 1][::-1]
+    return chain.from_iterable(map(row.__getitem__, cells))
+
+
 class State:
     """State in a Turing machine (TM)"""
     def __init__(self, name, transitions):
@@ -313,30 +790,201 @@ class State:
         self.transition_table = transition_table
 
 
+class ExecutionTrace:
+    """
+    Execution trace of a Turing machine (TM), recorded as an array with a
+    number for every read, write and move of the head. The text of the trace
+    is only rendered when it is requested.
+    """
+
+    # The kind of a record is stored in its lowest two bits, below the symbol
+    # read or written
+    READ, WRITE, RIGHT, LEFT = range(4)
+
+    def __init__(self, stream=None, chunk_size=1 << 16):
+        """
+        stream:     Optional text file object. The trace is then written to it
+                    in chunks of about 'chunk_size' records instead of kept in
+                    memory, so that the file receives exactly the text that
+                    text() would otherwise return.
+        chunk_size: See stream
+        """
+        self.records = array('H')
+        self.codes = {}
+        self.pieces = []
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.pending = ""
+        self.intern('⊢')
+
+    def intern(self, symbol):
+        """
+        Assign the next four records to reading, writing and moving after
+        'symbol', the moves are the same for every symbol
+        returns: The record for reading 'symbol'
+        """
+        code = len(self.pieces)
+        if code + self.LEFT > 0xFFFF and self.records.typecode == 'H':
+            self.records = array('L', self.records)
+        self.codes[symbol] = code
+        self.pieces += ["- " + symbol, " + " + symbol, " > ", " < "]
+        return code
+
+    def read(self, symbol):
+        code = self.codes.get(symbol)
+        if code is None:
+            code = self.intern(symbol)
+        self.records.append(code)
+
+    def write(self, symbol):
+        code = self.codes.get(symbol)
+        if code is None:
+            code = self.intern(symbol)
+        self.records.append(code + self.WRITE)
+
+    def move(self, direction):
+        self.records.append(self.RIGHT if direction == 'R' else self.LEFT)
+        if self.stream is not None and len(self.records) >= self.chunk_size:
+            self.flush()
+
+    def render(self):
+        """
+        returns: The text of the records in memory
+        """
+        return self.pending + "".join(map(self.pieces.__getitem__,
+                                          self.records))
+
+    def flush(self):
+        """
+        Write the records in memory to the stream, except for the final
+        character, which is omitted if the trace ends there
+        """
+        if self.stream is None:
+            return
+        text = self.render()
+        self.stream.write(text[:-1])
+        self.pending = text[-1:]
+        del self.records[:]
+
+    def text(self):
+        """
+        returns: The text of the trace, without the final space. If the trace
+        is streamed, it is flushed and the text is empty.
+        """
+        if self.stream is not None:
+            self.flush()
+            return ""
+        return self.render()[:-1]
+
+
 class Tape:
     """
     Tape (and head) of a Turing machine (TM)
+    The cells hold small integer ids of the tape symbols, with 0 for the
+    blank symbol. They are stored in segments of SEGMENT_SIZE cells, indexed
+    by a dictionary. Only segments in which a symbol other than the blank is
+    written are allocated, so long stretches of blanks take no memory.
     The tape also keeps track of the produced execution trace.
     """
-    def __init__(self, tm_input):
+    def __init__(self, tm_input, trace=None, symbols=None):
+        """
+        tm_input: The input on the tape
+        trace:    The ExecutionTrace that records the steps on the tape, or
+                  None to not record them
+        symbols:  Optional list of the tape symbols to number first, starting
+                  with the blank symbol, see TM.compile()
+        """
 
-        # The (initial) relevant 'finite' part of the tape
-        self.tape_actual = ['⊢']
+        # The tape symbols and their ids
+        self.names = list(symbols) if symbols else ['⊔']
+        self.ids = {symbol: idx for idx, symbol in enumerate(self.names)}
 
-        # Append the input to the tape
-        self.tape_actual += tm_input
+        # The segments of the tape by number. The cells hold a byte as long
+        # as there are at most 256 tape symbols.
+        self.segments = {}
+        self.wide = len(self.names) > 0x100
+
+        # The length of the relevant 'finite' part of the tape
+        self.length = 1 + len(tm_input)
+        for index, symbol in enumerate(['⊢'] + list(tm_input)):
+            self.put(index, symbol)
 
         # The current index of the TM head
         self.index = 0
 
-        self.execution_trace = ""
+        self.trace = trace
+
+    def intern(self, symbol):
+        """
+        Assign the next id to the tape symbol 'symbol'
+        returns: The id
+        """
+        code = len(self.names)
+        if code == 0x100:
+            # Widen the cells to hold the new id
+            self.wide = True
+            for number, segment in self.segments.items():
+                self.segments[number] = array('H', segment)
+        self.names.append(symbol)
+        self.ids[symbol] = code
+        return code
+
+    def new_segment(self):
+        """
+        returns: A segment of blank cells
+        """
+        if self.wide:
+            return array('H', bytes(2 * SEGMENT_SIZE))
+        return bytearray(SEGMENT_SIZE)
+
+    def get(self, index):
+        """
+        returns: The tape symbol in the cell at 'index'
+        """
+        segment = self.segments.get(index >> SEGMENT_BITS)
+        if segment is None:
+            return '⊔'
+        return self.names[segment[index & SEGMENT_MASK]]
+
+    def put(self, index, symbol):
+        """
+        Store the tape symbol 'symbol' in the cell at 'index'
+        """
+        code = self.ids.get(symbol)
+        if code is None:
+            code = self.intern(symbol)
+        segment = self.segments.get(index >> SEGMENT_BITS)
+        if segment is None:
+            if not code:
+                return
+            segment = self.segments[index >> SEGMENT_BITS] = \
+                self.new_segment()
+        segment[index & SEGMENT_MASK] = code
+
+    @property
+    def tape_actual(self):
+        """
+        The relevant 'finite' part of the tape, decoded to a list of tape
+        symbols
+        """
+        names = self.names
+        cells = []
+        for start in range(0, self.length, SEGMENT_SIZE):
+            size = min(SEGMENT_SIZE, self.length - start)
+            segment = self.segments.get(start >> SEGMENT_BITS)
+            if segment is None:
+                cells += ['⊔'] * size
+            else:
+                cells += map(names.__getitem__, segment[:size])
+        return cells
 
     def __str__(self):
         # Assume a monospace terminal font.
         tape_result = ""
         head_result = ""
+        tape_actual = self.tape_actual
 
-        for index in range(0, len(self.tape_actual)):
+        for index in range(0, len(tape_actual)):
             if index > 0:
                 tape_result += ' '
                 head_result += ' '
@@ -345,19 +993,28 @@ class Tape:
             if index == self.index:
                 head_result += '^'
             else:
-                head_result += ' ' * len(self.tape_actual[index])
+                head_result += ' ' * len(tape_actual[index])
 
-            tape_result += self.tape_actual[index]
+            tape_result += tape_actual[index]
 
         tape_result += " ⊔ ⊔ ⊔ ..."
 
         return tape_result + "\n" + head_result
 
+    @property
+    def execution_trace(self):
+        """ The text of the recorded execution trace, see ExecutionTrace """
+        if self.trace is None:
+            return ""
+        return self.trace.render()
+
     def read(self):
         """ Read tape contents at the current position of the head """
 
-        self.execution_trace += "- " + self.tape_actual[self.index]
-        return self.tape_actual[self.index]
+        symbol = self.get(self.index)
+        if self.trace is not None:
+            self.trace.read(symbol)
+        return symbol
 
     def write(self, symbol):
         """ Write symbol to the current position of the head """
@@ -367,24 +1024,27 @@ class Tape:
             sys.exit("TapeError: The TM has overwritten the left endmarker" +
                      " at the leftmost piece of tape")
 
-        self.execution_trace += " + " + symbol
-        self.tape_actual[self.index] = symbol
+        if self.trace is not None:
+            self.trace.write(symbol)
+        self.put(self.index, symbol)
 
     def move(self, direction):
         """ Move position of the head either to the left or to the right """
         if direction == 'R':
             # Check if we are at the end of the current 'finite' part.
-            if self.index == (len(self.tape_actual) - 1):
-                # Extend the finite part of the tape
-                self.tape_actual.append('⊔')
+            if self.index == self.length - 1:
+                # Extend the finite part of the tape with a blank cell
+                self.length += 1
             self.index += 1
-            self.execution_trace += " > "
+            if self.trace is not None:
+                self.trace.move(direction)
         elif direction == 'L':
             # Check if we are at the beginning of the tape
             if self.index == 0:
                 sys.exit("TapeError: The TM has moved off the tape")
             self.index -= 1
-            self.execution_trace += " < "
+            if self.trace is not None:
+                self.trace.move(direction)
         else:
             sys.exit("TapeError: Movement \'" + direction +
                      "\' does not equal either \'R\' or \'L\'")
@@ -0,0 +1,203 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#  Framework for Automaten en Formele Talen           #
+#  Written by Robin Visser, based on work by          #
+#  Bas van den Heuvel and Daan de Graaf               #
+#  This work is licensed under a Creative Commons     #
+#  “Attribution-ShareAlike 4.0 International”         #
+#   license.                                          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from TM import TM, Tape
+import contextlib
+import io
+import os
+import random
+import reverse
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def make_tm_definition(num_states, seed=0):
+    """
+    Creates the definition of a random TM with a transition for every state
+    and tape symbol
+    """
+    rng = random.Random(seed)
+    Q = ['q' + str(idx) for idx in range(num_states)] + ['t', 'r']
+    Sigma = ['0', '1', '|']
+    Gamma = Sigma + ['⊔', '⊢']
+    delta = [((state, symbol), (rng.choice(Q), rng.choice(Sigma + ['⊔']),
+                                rng.choice('LR')))
+             for state in Q[:num_states] for symbol in Sigma + ['⊔']]
+    delta += [((state, '⊢'), (rng.choice(Q), '⊢', 'R'))
+              for state in Q[:num_states]]
+    return Q, Sigma, Gamma, delta, Q[0], 't', 'r'
+
+
+def bench_startup(count):
+    """
+    Compares creating TMs with TM() against loading them with TM.cached()
+    """
+    definitions = [("random 50 states", make_tm_definition(50)),
+                   ("random 500 states", make_tm_definition(500))]
+
+    print("TM() vs TM.cached() (%d creations)" % count)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, definition in definitions:
+            creators = (("TM()", TM),
+                        ("TM.cached()", lambda *args:
+                         TM.cached(*args, cache_dir=cache_dir)))
+            for label, create in creators:
+                start = time.perf_counter()
+                for _ in range(count):
+                    create(*definition)
+                elapsed = time.perf_counter() - start
+                print("%24s %12s %10.3f ms" % (name, label,
+                                               elapsed / count * 1e3))
+
+
+def make_xor_tm():
+    """
+    Creates the XOR machine of reverse.reverse_manually without its output
+    and without a step limit
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        tm = reverse.reverse_manually()
+    tm.verbose = False
+    tm.max_steps = float('inf')
+    return tm
+
+
+def make_xor_input(half, seed=0):
+    """
+    Creates an input for the XOR machine with two halves of 'half' digits
+    """
+    rng = random.Random(seed)
+    return ''.join(rng.choice('01') for _ in range(half)) + '|' + \
+        ''.join(rng.choice('01') for _ in range(half))
+
+
+def bench_trace(half):
+    """
+    Compares the time and memory of recording the execution trace in memory,
+    streaming it to a file and not recording it
+    """
+    tm = make_xor_tm()
+    tm_input = make_xor_input(half)
+
+    print("TM execution trace (input length %d)" % len(tm_input))
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        for label, record, stream in (("in memory", True, None),
+                                      ("streamed", True, devnull),
+                                      ("off", False, None)):
+            tm.set_trace(record, stream)
+            tm.set_input(tm_input)
+            tracemalloc.start()
+            start = time.perf_counter()
+            tm.transition_all()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print("%24s %10.3f s %10.1f MB %12d steps" %
+                  (label, elapsed, peak / 2 ** 20, tm.step_counter))
+
+
+def bench_steps(half):
+    """
+    Compares the steps per second of single transitions against the dense
+    table and the generated simulator of transition_all, with and without
+    recording the execution trace
+    """
+    tm = make_xor_tm()
+    tm_input = make_xor_input(half)
+
+    def single_steps():
+        while tm.transition():
+            pass
+
+    print("TM steps per second (input length %d)" % len(tm_input))
+    start = time.perf_counter()
+    tm.compile_simulator()
+    elapsed = time.perf_counter() - start
+    print("%24s %10.3f s" % ("compile_simulator", elapsed))
+
+    for record in (True, False):
+        for label, specialized, run in (
+                ("transition", False, single_steps),
+                ("transition_all", False, tm.transition_all),
+                ("simulator", True, tm.transition_all)):
+            tm.specialized = specialized
+            tm.set_trace(record)
+            tm.set_input(tm_input)
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            label += " (trace)" if record else ""
+            print("%24s %10.3f s %14.0f steps/s" %
+                  (label, elapsed, tm.step_counter / elapsed))
+
+
+def bench_sweeps(halves):
+    """
+    Compares transition_all with and without taking the sweeps of the XOR
+    machine at once, on growing inputs and without recording the execution
+    trace
+    """
+    tm = make_xor_tm()
+    tm.set_trace(False)
+
+    print("TM sweeps")
+    for half in halves:
+        tm_input = make_xor_input(half)
+        for label, sweeps in (("single steps", False), ("sweeps", True)):
+            tm.compile()
+            if not sweeps:
+                tm.sweeps = [None] * len(tm.table)
+            tm.set_input(tm_input)
+            start = time.perf_counter()
+            tm.transition_all()
+            elapsed = time.perf_counter() - start
+            print("%24s %10.3f s %12d steps" %
+                  ("%s (%d)" % (label, len(tm_input)), elapsed,
+                   tm.step_counter))
+
+
+def bench_tape(cells):
+    """
+    Measures the memory of a tape of which the head writes 'cells' cells,
+    first only blanks and then only non-blank symbols
+    """
+    print("TM tape (%d cells)" % cells)
+    for symbol in ('⊔', '1'):
+        tracemalloc.start()
+        start = time.perf_counter()
+        tape = Tape("")
+        for _ in range(cells):
+            tape.move('R')
+            tape.read()
+            tape.write(symbol)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print("%24s %10.3f s %10.1f MB" % ("writing " + symbol, elapsed,
+                                           peak / 2 ** 20))
+
+
+def main(count):
+    """
+    Runs all benchmarks
+    """
+    bench_startup(count)
+    bench_trace(200)
+    bench_steps(1000)
+    bench_sweeps([1000, 2000, 4000])
+    bench_tape(10 ** 6)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main(20)